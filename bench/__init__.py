@@ -0,0 +1,7 @@
+"""Offline benchmarks for the Emerald Hot Water System integration.
+
+Runs the integration inside a throwaway Home Assistant instance against
+FakeEmeraldHWS, an in-process stand-in for emerald_hws that replays recorded or
+synthetic status streams, so that performance can be measured without the
+Emerald cloud. Start it with scripts/bench; see bench/__main__.py for options.
+"""
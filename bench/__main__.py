@@ -0,0 +1,434 @@
+"""Run the benchmarks: python3 -m bench [options], or scripts/bench [options].
+
+setup     time from adding the entry to every unit's water heater being live,
+          for each --setup-units count
+replay    replays a status stream to --units units at --rate messages per
+          second and reports the latency from each message that changes a
+          unit to its water heater's state being written, the executor jobs
+          and state writes per message
+imports   time to import the integration's modules in a fresh interpreter,
+          best of --import-runs, against --import-budget; fails if that is
+          over budget or the Emerald client library was imported with them
+memory    memory held per unit once set up, for each --memory-units count,
+          in total and allocated by the integration itself; then what replaying
+          --memory-messages messages retains and allocates at its peak
+bulk      time to change the mode of --units units whose publishes each take
+          --ack-delay seconds, one water heater at a time and then with one
+          emeraldenergy.set_mode call, --bulk-concurrency units at once
+
+All run by default; name some to run only those. --recording replays a JSON
+lines recording (see bench.fake_hws.load_recording) instead of a synthetic
+stream.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from homeassistant.core import Event
+
+from .fake_hws import FakeAccount, Replayer, ReplayMessage, load_recording
+from .fake_hws import synthetic_stream
+from .harness import BenchHarness
+
+
+BENCHMARKS = ["setup", "replay", "imports", "memory", "bulk"]
+# What importing the integration's own modules may cost, once Home Assistant and
+# the other libraries it uses are loaded
+IMPORT_BUDGET_MS = 150
+# Allocations with a frame in the integration's code, as opposed to Home
+# Assistant's or the fake client's
+_INTEGRATION_FILTER = tracemalloc.Filter(
+    True, "*custom_components/emeraldenergy/*", all_frames=True
+)
+
+
+def _percentile(values: list[float], share: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def _ms(seconds: float | None) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.2f} ms"
+
+
+async def bench_setup(args: argparse.Namespace) -> dict:
+    """Time setting up the entry for each unit count."""
+    results = {}
+    for units in args.setup_units:
+        async with BenchHarness(
+            FakeAccount(units), update_window=args.update_window
+        ) as harness:
+            elapsed = await harness.async_setup_entry()
+            results[units] = {
+                "seconds": elapsed,
+                "phases": dict(harness.entry_data["setup_timings"]),
+            }
+        print(f"setup {units:>4} units: {_ms(elapsed)}")
+        for phase, seconds in results[units]["phases"].items():
+            if phase != "connect_attempts":
+                print(f"    {phase:<14} {_ms(seconds)}")
+    return results
+
+
+async def bench_replay(args: argparse.Namespace) -> dict:
+    """Replay a stream and measure latency, executor jobs and state writes."""
+    account = FakeAccount(args.units)
+    if args.recording:
+        stream: list[ReplayMessage] = load_recording(args.recording)
+    else:
+        stream = list(
+            synthetic_stream(account.unit_ids, args.messages, args.rate, seed=args.seed)
+        )
+
+    async with BenchHarness(account, update_window=args.update_window) as harness:
+        await harness.async_setup_entry()
+        units = harness.water_heater_units()
+        entity_ids = harness.entity_ids()
+
+        # perf_counter() of the oldest message not yet shown, per unit. Set on
+        # the replay thread, cleared on the event loop.
+        pending: dict[str, float] = {}
+        latencies: list[float] = []
+        writes = 0
+
+        def _on_send(message: ReplayMessage) -> None:
+            if message.changes:
+                pending.setdefault(message.topic.split("/")[-1], time.perf_counter())
+
+        def _on_state_changed(event: Event) -> None:
+            nonlocal writes
+            entity_id = event.data["entity_id"]
+            if entity_id not in entity_ids:
+                return
+            writes += 1
+            if (hws_uuid := units.get(entity_id)) and hws_uuid in pending:
+                latencies.append(time.perf_counter() - pending.pop(hws_uuid))
+
+        harness.listen_state_changes(_on_state_changed)
+        shared_jobs = harness.count_executor_jobs()
+        executor = harness.entry_data["executor"]
+        entry_jobs = executor.completed_jobs
+        replayer = Replayer(
+            harness.clients[-1], stream, speed=args.speed, on_send=_on_send
+        )
+        start = time.perf_counter()
+        replayer.start()
+        await harness.async_wait_for(lambda: replayer.done, timeout=None)
+        elapsed = time.perf_counter() - start
+        # Let the last coalescing windows close.
+        await asyncio.sleep(args.update_window + 0.5)
+
+        sent = replayer.sent
+        jobs = shared_jobs() + executor.completed_jobs - entry_jobs
+        coordinators = harness.entry_data["coordinators"].values()
+        result = {
+            "units": args.units,
+            "messages": sent,
+            "seconds": elapsed,
+            "latency": {
+                "samples": len(latencies),
+                "mean": statistics.fmean(latencies) if latencies else None,
+                "p50": _percentile(latencies, 0.5),
+                "p95": _percentile(latencies, 0.95),
+                "p99": _percentile(latencies, 0.99),
+                "max": max(latencies, default=None),
+            },
+            "executor_jobs": jobs,
+            "executor_jobs_per_message": jobs / sent if sent else None,
+            "state_writes": writes,
+            "state_writes_per_message": writes / sent if sent else None,
+            "coalesced_updates": sum(c.coalesced_updates for c in coordinators),
+            "skipped_writes": sum(c.skipped_writes for c in coordinators),
+        }
+
+    latency = result["latency"]
+    print(
+        f"replay {sent} messages to {args.units} units in {elapsed:.2f} s "
+        f"({sent / elapsed if elapsed else 0:.0f}/s)"
+    )
+    print(
+        f"    latency      p50 {_ms(latency['p50'])}  p95 {_ms(latency['p95'])}  "
+        f"p99 {_ms(latency['p99'])}  max {_ms(latency['max'])}  "
+        f"({latency['samples']} samples)"
+    )
+    print(
+        f"    executor     {jobs} jobs, "
+        f"{result['executor_jobs_per_message'] or 0:.3f} per message"
+    )
+    print(
+        f"    state writes {writes}, "
+        f"{result['state_writes_per_message'] or 0:.3f} per message "
+        f"({result['coalesced_updates']} coalesced, "
+        f"{result['skipped_writes']} skipped as unchanged)"
+    )
+    return result
+
+
+def bench_imports(args: argparse.Namespace) -> dict:
+    """Time importing the integration, and check it stays within budget."""
+    runs = []
+    for _ in range(args.import_runs):
+        probe = subprocess.run(
+            [sys.executable, "-m", "bench.import_probe"],
+            capture_output=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent.parent,
+            text=True,
+        )
+        runs.append(json.loads(probe.stdout))
+    best = min(run["seconds"] for run in runs)
+    lazy_loaded = sorted({name for run in runs for name in run["lazy_loaded"]})
+    passed = best * 1000 <= args.import_budget and not lazy_loaded
+    print(
+        f"imports {runs[0]['modules']} modules: best {_ms(best)} of "
+        f"{len(runs)} runs, budget {args.import_budget:.0f} ms"
+        f"{'' if passed else '  FAILED'}"
+    )
+    if lazy_loaded:
+        print(f"    imported at load time: {', '.join(lazy_loaded)}")
+    return {
+        "seconds": best,
+        "budget_seconds": args.import_budget / 1000,
+        "lazy_loaded": lazy_loaded,
+        "passed": passed,
+    }
+
+
+def _traced(snapshot: tracemalloc.Snapshot, own: bool = False) -> int:
+    if own:
+        snapshot = snapshot.filter_traces([_INTEGRATION_FILTER])
+    return sum(stat.size for stat in snapshot.statistics("filename"))
+
+
+async def bench_memory(args: argparse.Namespace) -> dict:
+    """Measure the memory held per unit, and what replaying messages costs."""
+    results = {}
+    # Deep enough to reach the integration's frames beneath Home Assistant's
+    tracemalloc.start(25)
+    try:
+        for units in args.memory_units:
+            account = FakeAccount(units)
+            async with BenchHarness(
+                account, update_window=args.update_window
+            ) as harness:
+                gc.collect()
+                before = tracemalloc.take_snapshot()
+                await harness.async_setup_entry()
+                # Let the writes queued by setup finish.
+                await asyncio.sleep(0.1)
+                gc.collect()
+                after = tracemalloc.take_snapshot()
+                per_unit = (_traced(after) - _traced(before)) / units
+                own = (_traced(after, True) - _traced(before, True)) / units
+
+                stream = synthetic_stream(
+                    account.unit_ids, args.memory_messages, 1, seed=args.seed
+                )
+                replayer = Replayer(harness.clients[-1], stream, speed=0)
+                start, _peak = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                replayer.start()
+                await harness.async_wait_for(lambda: replayer.done, timeout=None)
+                await asyncio.sleep(args.update_window + 0.5)
+                _current, peak = tracemalloc.get_traced_memory()
+                gc.collect()
+                retained, _peak = tracemalloc.get_traced_memory()
+                sent = replayer.sent
+
+            results[units] = {
+                "bytes_per_unit": per_unit,
+                "integration_bytes_per_unit": own,
+                "messages": sent,
+                "retained_bytes_per_message": (retained - start) / sent,
+                "peak_bytes": peak - start,
+            }
+            print(
+                f"memory {units:>4} units: {per_unit / 1024:.1f} KiB per unit, "
+                f"{own / 1024:.1f} KiB of it allocated by the integration"
+            )
+            print(
+                f"    replay       {sent} messages retained "
+                f"{(retained - start) / sent:.0f} bytes per message, "
+                f"peak {(peak - start) / 1024:.1f} KiB"
+            )
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+async def bench_bulk(args: argparse.Namespace) -> dict:
+    """Time a fleet-wide mode change, unit by unit and with set_mode."""
+    async with BenchHarness(
+        FakeAccount(args.units),
+        update_window=args.update_window,
+        fake_options={"ack_delay": args.ack_delay},
+    ) as harness:
+        await harness.async_setup_entry()
+        hass = harness.hass
+        entity_ids = sorted(harness.water_heater_units())
+
+        start = time.perf_counter()
+        for entity_id in entity_ids:
+            await hass.services.async_call(
+                "water_heater",
+                "set_operation_mode",
+                {"entity_id": entity_id, "operation_mode": "performance"},
+                blocking=True,
+            )
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        response = await hass.services.async_call(
+            "emeraldenergy",
+            "set_mode",
+            {
+                "entity_id": entity_ids,
+                "operation_mode": "eco",
+                "max_concurrent": args.bulk_concurrency,
+            },
+            blocking=True,
+            return_response=True,
+        )
+        bulk = time.perf_counter() - start
+
+    outcomes: dict[str, int] = {}
+    for outcome in response["results"].values():
+        outcomes[outcome["result"]] = outcomes.get(outcome["result"], 0) + 1
+    result = {
+        "units": args.units,
+        "ack_delay": args.ack_delay,
+        "concurrency": args.bulk_concurrency,
+        "sequential_seconds": sequential,
+        "bulk_seconds": bulk,
+        "outcomes": outcomes,
+    }
+    print(
+        f"bulk {args.units} units, {_ms(args.ack_delay)} per publish: "
+        f"one at a time {_ms(sequential)}, set_mode {_ms(bulk)} "
+        f"({args.bulk_concurrency} at once; "
+        + ", ".join(f"{count} {name}" for name, count in sorted(outcomes.items()))
+        + ")"
+    )
+    return result
+
+
+def _parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="scripts/bench",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        metavar="{setup,replay,imports,memory,bulk}",
+        default=BENCHMARKS,
+    )
+    parser.add_argument("--units", type=int, default=10, help="units to replay to")
+    parser.add_argument(
+        "--setup-units",
+        type=int,
+        nargs="+",
+        default=[1, 10, 100],
+        help="unit counts to time setup for",
+    )
+    parser.add_argument(
+        "--import-runs", type=int, default=5, help="times to import the integration"
+    )
+    parser.add_argument(
+        "--import-budget",
+        type=float,
+        default=IMPORT_BUDGET_MS,
+        help="milliseconds importing the integration may take",
+    )
+    parser.add_argument(
+        "--memory-units",
+        type=int,
+        nargs="+",
+        default=[10, 100],
+        help="unit counts to measure memory for",
+    )
+    parser.add_argument(
+        "--memory-messages",
+        type=int,
+        default=1000,
+        help="messages to replay while measuring memory",
+    )
+    parser.add_argument(
+        "--rate", type=float, default=50, help="synthetic messages per second"
+    )
+    parser.add_argument(
+        "--messages", type=int, default=2000, help="synthetic messages to replay"
+    )
+    parser.add_argument("--recording", type=Path, help="replay this recording instead")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="replay speed multiplier, 0 for as fast as possible",
+    )
+    parser.add_argument(
+        "--update-window", type=int, default=2, help="coalescing window (seconds)"
+    )
+    parser.add_argument(
+        "--ack-delay",
+        type=float,
+        default=0.2,
+        help="seconds each fake publish takes, for bulk",
+    )
+    parser.add_argument(
+        "--bulk-concurrency",
+        type=int,
+        default=8,
+        help="units set_mode commands at once, for bulk",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    parser.add_argument("--verbose", action="store_true", help="log the integration")
+    args = parser.parse_args(argv)
+    if unknown := set(args.benchmarks) - set(BENCHMARKS):
+        parser.error(f"unknown benchmark: {', '.join(sorted(unknown))}")
+    return args
+
+
+async def _async_main(args: argparse.Namespace) -> dict:
+    results = {}
+    if "setup" in args.benchmarks:
+        results["setup"] = await bench_setup(args)
+    if "replay" in args.benchmarks:
+        results["replay"] = await bench_replay(args)
+    if "imports" in args.benchmarks:
+        results["imports"] = bench_imports(args)
+    if "memory" in args.benchmarks:
+        results["memory"] = await bench_memory(args)
+    if "bulk" in args.benchmarks:
+        results["bulk"] = await bench_bulk(args)
+    return results
+
+
+def main(argv: list[str]) -> None:
+    """Run the benchmarks named on the command line."""
+    args = _parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    results = asyncio.run(_async_main(args))
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    if not results.get("imports", {}).get("passed", True):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,494 @@
+"""In-process stand-in for emerald_hws.emeraldhws.EmeraldHWS."""
+
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+
+@dataclass(slots=True)
+class ReplayMessage:
+    """One MQTT message to replay, delay seconds after the one before it.
+
+    changes is False for a message that repeats the unit's state, which no
+    entity should be written for.
+    """
+
+    delay: float
+    topic: str
+    payload: bytes
+    changes: bool = True
+
+
+def status_topic(hws_uuid: str) -> str:
+    """Return the topic a unit publishes its status on."""
+    return f"ep/heat_pump/from_gw/{hws_uuid}"
+
+
+def status_payload(hws_uuid: str, command: str, body: dict) -> bytes:
+    """Return an MQTT payload in the form Emerald units send."""
+    header = {
+        "device_id": hws_uuid,
+        "namespace": "business",
+        "direction": "gw2app",
+        "command": command,
+        "msg_id": str(random.randint(100, 9999)),
+    }
+    return json.dumps([header, body]).encode()
+
+
+class FakeAccount:
+    """The units of one fake Emerald account, shared by every client built for it.
+
+    Mirrors the property list the Emerald REST API returns, so that each client
+    starts from the same state, as real clients do.
+    """
+
+    def __init__(self, units: int, *, seed: int = 0) -> None:
+        """Create an account with the given number of units."""
+        rnd = random.Random(seed)
+        self.unit_ids = [str(uuid.UUID(int=rnd.getrandbits(128))) for _ in range(units)]
+
+    def add_unit(self) -> str:
+        """Add a unit to the account, as if installed after setup."""
+        hws_uuid = str(uuid.uuid4())
+        self.unit_ids.append(hws_uuid)
+        return hws_uuid
+
+    def properties(self) -> list[dict]:
+        """Return a fresh copy of the account's property list."""
+        today = datetime.now().strftime("%Y-%m-%d")
+        return [
+            {
+                "id": "property-1",
+                "heat_pump": [
+                    {
+                        "id": hws_uuid,
+                        "property_id": "property-1",
+                        "mac_address": f"00:00:00:00:{index // 256:02x}:{index % 256:02x}",
+                        "serial_number": f"FAKE{index:05d}",
+                        "brand": "Emerald",
+                        "hw_version": "1.0",
+                        "soft_version": "1.0",
+                        "device_operation_status": 0,
+                        "last_state": {
+                            "switch": 1,
+                            "mode": 1,
+                            "temp_current": 55,
+                            "temp_set": 60,
+                            "work_state": 2,
+                        },
+                        "consumption_data": json.dumps(
+                            {
+                                "current_hour": 0.2,
+                                "last_data_at": f"{today} 00:00:00",
+                                "past_seven_days": {today: 1.5},
+                                "monthly_consumption": {today[:7]: 20.0},
+                            }
+                        ),
+                    }
+                    for index, hws_uuid in enumerate(self.unit_ids)
+                ],
+            }
+        ]
+
+
+class FakeEmeraldHWS:
+    """Implements the parts of EmeraldHWS the integration uses, without a cloud.
+
+    connect() "connects" at once, after connect_delay seconds, and messages reach
+    mqttDecodeUpdate exactly as the real client's MQTT thread delivers them, so
+    the integration's dispatcher wrapping works unchanged. Control calls block
+    for ack_delay seconds like a publish, and the unit echoes the new state
+    echo_delay seconds later, on a timer thread.
+    """
+
+    def __init__(
+        self,
+        email,
+        password,
+        update_callback=None,
+        connection_timeout_minutes=720,
+        health_check_minutes=60,
+        *,
+        account: FakeAccount,
+        connect_delay: float = 0.0,
+        ack_delay: float = 0.0,
+        echo_delay: float = 0.0,
+    ) -> None:
+        """Initialise a client for the fake account."""
+        self.email = email
+        self.password = password
+        self.token = ""
+        self.properties: list[dict] = []
+        self.update_callback = update_callback
+        self.connection_timeout = connection_timeout_minutes * 60.0
+        self.health_check_interval = health_check_minutes * 60.0
+        self.last_message_time = None
+        self._account = account
+        self._connect_delay = connect_delay
+        self._ack_delay = ack_delay
+        self._echo_delay = echo_delay
+        self._state_lock = threading.RLock()
+        self._mqtt_lock = threading.RLock()
+        self.reconnect_timer = None
+        self.health_check_timer = None
+        self._setup_complete = False
+        self._timers: list[threading.Timer] = []
+        # Every library call made, by method name, for the benchmarks
+        self.calls: dict[str, int] = {}
+
+    def _count(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    # Session
+
+    def getLoginToken(self):
+        """Return a token for any credentials."""
+        self._count("getLoginToken")
+        self.token = "fake-token"
+        return self.token
+
+    def getAllHWS(self):
+        """Load the account's property list."""
+        self._count("getAllHWS")
+        if not self.token:
+            self.getLoginToken()
+        with self._state_lock:
+            self.properties = self._account.properties()
+
+    def connect(self):
+        """Log in, load the units and report the MQTT connection as established.
+
+        Like emerald_hws, a connect always logs in again, even with a token.
+        """
+        self._count("connect")
+        if self._setup_complete:
+            return
+        if self._connect_delay:
+            time.sleep(self._connect_delay)
+        self.getLoginToken()
+        self.getAllHWS()
+        self._setup_complete = True
+        self.on_lifecycle_connection_success(None)
+
+    def on_lifecycle_connection_success(self, lifecycle_connect_success_data):
+        """Handle a successful MQTT connection."""
+
+    def scheduled_reconnect(self):
+        """Reconnect on the connection timeout; the fake connection never drops."""
+
+    def check_connection_health(self):
+        """Check for silence on the health check interval; there is none here."""
+
+    def disconnect(self):
+        """Stop the echo timers."""
+        self._count("disconnect")
+        for timer in self._timers:
+            timer.cancel()
+        self._timers.clear()
+
+    def replaceCallback(self, update_callback):
+        """Replace the update callback, without calling it.
+
+        As emerald_hws 0.0.30 does: the new callback is only stored, and first
+        called for the next status key applied.
+        """
+        self.update_callback = update_callback
+
+    def subscribeForUpdates(self, id):
+        """Subscribe to a unit's status topic."""
+        self._count("subscribeForUpdates")
+
+    def requestAllStatusUpdates(self):
+        """Ask every unit to report; the fake units have nothing new to say."""
+        self._count("requestAllStatusUpdates")
+
+    # Incoming messages
+
+    def mqttCallback(self, topic: str, payload: bytes) -> None:
+        """Deliver one message as the MQTT thread would."""
+        self.last_message_time = time.time()
+        self.mqttDecodeUpdate(topic, payload)
+
+    def mqttDecodeUpdate(self, topic, payload):
+        """Apply a status message, firing the callback once per key like emerald_hws."""
+        json_payload = json.loads(payload.decode("utf-8"))
+        hws_id = topic.split("/")[-1]
+        command = json_payload[0].get("command")
+        if command in ("upload_status", "comp_query"):
+            for key, value in json_payload[1].items():
+                self.updateHWSState(hws_id, key, value)
+        elif command == "update_hour_energy":
+            self._updateEnergyUsage(hws_id, json_payload[1])
+
+    def updateHWSState(self, id, key, value):
+        """Set one status key of a unit and fire the update callback."""
+        with self._state_lock:
+            if (status := self._find(id)) is not None:
+                status["last_state"][key] = value
+        if self.update_callback is not None:
+            self.update_callback()
+
+    def _updateEnergyUsage(self, id, energy_data):
+        """Add an hour's energy to a unit's consumption data."""
+        start_time = energy_data["start_time"]
+        date_key = start_time.split(" ")[0]
+        with self._state_lock:
+            if (status := self._find(id)) is not None:
+                consumption = json.loads(status["consumption_data"])
+                consumption["current_hour"] = energy_data["data"]
+                consumption["last_data_at"] = start_time
+                days = consumption["past_seven_days"]
+                days[date_key] = days.get(date_key, 0) + energy_data["data"]
+                status["consumption_data"] = json.dumps(consumption)
+        if self.update_callback is not None:
+            self.update_callback()
+
+    # Getters
+
+    def _find(self, id):
+        for properties in self.properties:
+            for heat_pump in properties.get("heat_pump", []):
+                if heat_pump["id"] == id:
+                    return heat_pump
+        return None
+
+    def getFullStatus(self, id):
+        """Return the full status of a unit, connecting first on a cold start."""
+        self._count("getFullStatus")
+        if not self._setup_complete:
+            self.connect()
+        with self._state_lock:
+            return self._find(id)
+
+    def listHWS(self):
+        """Return the UUIDs of every unit."""
+        self._count("listHWS")
+        if not self._setup_complete:
+            self.connect()
+        return [
+            heat_pump["id"]
+            for properties in self.properties
+            for heat_pump in properties.get("heat_pump", [])
+        ]
+
+    def getInfo(self, id):
+        """Return a unit's identifying details."""
+        status = self.getFullStatus(id) or {}
+        return {
+            key: status.get(key)
+            for key in ("id", "serial_number", "brand", "hw_version", "soft_version")
+        }
+
+    def isOn(self, id):
+        """Return whether a unit is on."""
+        status = self.getFullStatus(id)
+        return bool(status) and status["last_state"].get("switch") in (1, "on")
+
+    def isHeating(self, id):
+        """Return whether a unit is heating."""
+        status = self.getFullStatus(id)
+        return bool(status) and status["last_state"].get("work_state") == 1
+
+    def currentMode(self, id):
+        """Return a unit's mode."""
+        status = self.getFullStatus(id)
+        return status["last_state"].get("mode") if status else None
+
+    def getHistoricalConsumption(self, id):
+        """Return a unit's parsed consumption data."""
+        status = self.getFullStatus(id)
+        return json.loads(status["consumption_data"]) if status else None
+
+    def getDailyEnergyUsage(self, id):
+        """Return a unit's energy today."""
+        consumption = self.getHistoricalConsumption(id) or {}
+        today = datetime.now().strftime("%Y-%m-%d")
+        return consumption.get("past_seven_days", {}).get(today)
+
+    def getHourlyEnergyUsage(self, id):
+        """Return a unit's energy in the last reported hour."""
+        consumption = self.getHistoricalConsumption(id) or {}
+        return consumption.get("current_hour")
+
+    # Control
+
+    def _control(self, id, body: dict) -> None:
+        self._count("sendControlMessage")
+        if self.getFullStatus(id) is None:
+            raise Exception(f"Unable to find HWS with ID {id}")
+        if self._ack_delay:
+            time.sleep(self._ack_delay)
+        timer = threading.Timer(
+            self._echo_delay,
+            self.mqttCallback,
+            (status_topic(id), status_payload(id, "upload_status", body)),
+        )
+        timer.daemon = True
+        self._timers.append(timer)
+        timer.start()
+
+    def turnOn(self, id):
+        """Turn a unit on."""
+        self._control(id, {"switch": 1})
+
+    def turnOff(self, id):
+        """Turn a unit off."""
+        self._control(id, {"switch": 0})
+
+    def setNormalMode(self, id):
+        """Put a unit in normal mode."""
+        self._control(id, {"mode": 1})
+
+    def setBoostMode(self, id):
+        """Put a unit in boost mode."""
+        self._control(id, {"mode": 0})
+
+    def setQuietMode(self, id):
+        """Put a unit in quiet mode."""
+        self._control(id, {"mode": 2})
+
+
+def synthetic_stream(
+    unit_ids: list[str],
+    messages: int,
+    rate: float,
+    *,
+    heartbeat_share: float = 0.5,
+    burst: int = 3,
+    seed: int = 0,
+) -> Iterator[ReplayMessage]:
+    """Yield a status stream across the units at rate messages per second.
+
+    A share of the messages are heartbeats repeating the last state, as units send
+    them; the rest are bursts of burst messages (temperature, then heating, then
+    temperature again), the way a unit reports a single change. Temperatures step
+    by whole degrees and heating flips, so that every other message changes what
+    is shown.
+    """
+    rnd = random.Random(seed)
+    temps = dict.fromkeys(unit_ids, 55)
+    heating = dict.fromkeys(unit_ids, False)
+    interval = 1 / rate if rate > 0 else 0.0
+    sent = 0
+    while sent < messages:
+        hws_uuid = rnd.choice(unit_ids)
+        if rnd.random() < heartbeat_share:
+            body = {"temp_current": temps[hws_uuid]}
+            yield ReplayMessage(
+                interval, status_topic(hws_uuid), _status(body), changes=False
+            )
+            sent += 1
+            continue
+        for step in range(min(burst, messages - sent)):
+            if step == 1:
+                heating[hws_uuid] = not heating[hws_uuid]
+                body = {"work_state": 1 if heating[hws_uuid] else 2}
+            else:
+                temps[hws_uuid] = 54 if temps[hws_uuid] == 56 else temps[hws_uuid] + 1
+                body = {"temp_current": temps[hws_uuid]}
+            yield ReplayMessage(interval, status_topic(hws_uuid), _status(body))
+            sent += 1
+
+
+def _status(body: dict) -> bytes:
+    return status_payload("", "upload_status", body)
+
+
+def load_recording(path: Path) -> list[ReplayMessage]:
+    """Load a recorded stream: JSON lines of {"t": seconds, "topic", "payload"}.
+
+    t is the time since the start of the recording; payload the message as JSON
+    (the form the status recorder exports). The JSON lines the export_recording
+    service writes load as they are; the recording in a diagnostics download is a
+    JSON list of the same records, under "recording" -> "messages", and loads as
+    well.
+    """
+    text = path.read_text()
+    try:
+        document = json.loads(text)
+    except ValueError:
+        # More than one line of records
+        document = None
+    if isinstance(document, dict) and "t" not in document:
+        # A diagnostics download
+        records = document.get("data", document)["recording"]["messages"]
+    else:
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+    messages = []
+    last = 0.0
+    for record in records:
+        payload = record["payload"]
+        if not isinstance(payload, str):
+            payload = json.dumps(payload)
+        messages.append(
+            ReplayMessage(record["t"] - last, record["topic"], payload.encode())
+        )
+        last = record["t"]
+    return messages
+
+
+class Replayer:
+    """Deliver a stream to a client from a thread, like its MQTT thread would.
+
+    on_send is called with each message just before it is delivered, to time the
+    path from message to state. speed scales the stream's delays; 0 replays as
+    fast as possible.
+    """
+
+    def __init__(
+        self,
+        client: FakeEmeraldHWS,
+        stream: Iterable[ReplayMessage],
+        *,
+        speed: float = 1.0,
+        on_send: Callable[[ReplayMessage], None] | None = None,
+    ) -> None:
+        """Prepare the replay; call start() to begin."""
+        self._client = client
+        self._stream = stream
+        self._speed = speed
+        self._on_send = on_send
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="fake-mqtt")
+        self.sent = 0
+
+    def start(self) -> None:
+        """Start delivering messages."""
+        self._thread.start()
+
+    @property
+    def done(self) -> bool:
+        """Return whether every message has been delivered, or the replay stopped."""
+        return not self._thread.is_alive()
+
+    def join(self, timeout: float | None = None) -> None:
+        """Wait for the stream to finish."""
+        self._thread.join(timeout)
+
+    def stop(self) -> None:
+        """Stop delivering messages."""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        deadline = time.perf_counter()
+        for message in self._stream:
+            if self._speed:
+                deadline += message.delay / self._speed
+                if self._stop.wait(max(0.0, deadline - time.perf_counter())):
+                    return
+            elif self._stop.is_set():
+                return
+            if self._on_send is not None:
+                self._on_send(message)
+            self._client.mqttCallback(message.topic, message.payload)
+            self.sent += 1
@@ -0,0 +1,214 @@
+"""A throwaway Home Assistant running the integration against FakeEmeraldHWS."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from homeassistant import loader
+from homeassistant.config_entries import ConfigEntries, ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME, EVENT_STATE_CHANGED
+from homeassistant.core import CoreState, Event, HomeAssistant, callback
+from homeassistant.helpers import (
+    area_registry as ar,
+    category_registry as cr,
+    device_registry as dr,
+    entity,
+    entity_registry as er,
+    floor_registry as fr,
+    frame,
+    issue_registry as ir,
+    label_registry as lr,
+    translation,
+)
+
+from .fake_hws import FakeAccount, FakeEmeraldHWS
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DOMAIN = "emeraldenergy"
+
+
+class BenchHarness:
+    """Set up the integration in a fresh Home Assistant for one benchmark run.
+
+    The integration is loaded from this checkout through the custom_components
+    directory of a temporary config dir, and every EmeraldHWS it builds -- in
+    the config flow and in setup -- is a FakeEmeraldHWS on the same account.
+    Energy monitoring is off unless asked for, since its statistics need the
+    recorder, which the harness does not run.
+
+    Use as an async context manager; the instance is stopped on exit.
+    """
+
+    def __init__(
+        self,
+        account: FakeAccount,
+        *,
+        update_window: int = 2,
+        energy_monitoring: bool = False,
+        fake_options: dict[str, Any] | None = None,
+    ) -> None:
+        """Prepare a harness for the account."""
+        self.account = account
+        self.update_window = update_window
+        self.energy_monitoring = energy_monitoring
+        self.fake_options = fake_options or {}
+        self.hass: HomeAssistant | None = None
+        self.entry: ConfigEntry | None = None
+        # Every client the integration built, most recent last
+        self.clients: list[FakeEmeraldHWS] = []
+        self._tmp: tempfile.TemporaryDirectory | None = None
+        self._unpatch: list[Callable[[], None]] = []
+
+    async def __aenter__(self) -> BenchHarness:
+        """Start Home Assistant."""
+        self._tmp = tempfile.TemporaryDirectory(prefix="emerald-bench-")
+        config_dir = Path(self._tmp.name)
+        (config_dir / "custom_components").mkdir()
+        (config_dir / "custom_components" / DOMAIN).symlink_to(
+            REPO_ROOT / "custom_components" / DOMAIN
+        )
+        sys.path.insert(0, str(config_dir))
+        self._patch_client()
+
+        hass = self.hass = HomeAssistant(str(config_dir))
+        hass.config.skip_pip = True
+        # The manifest depends on the recorder only for energy statistics.
+        hass.config.components.add("recorder")
+        loader.async_setup(hass)
+        frame.async_setup(hass)
+        entity.async_setup(hass)
+        translation.async_setup(hass)
+        await asyncio.gather(
+            ar.async_load(hass),
+            cr.async_load(hass),
+            fr.async_load(hass),
+            ir.async_load(hass),
+            lr.async_load(hass),
+        )
+        await dr.async_load(hass)
+        await er.async_load(hass)
+        hass.config_entries = ConfigEntries(hass, {})
+        await hass.config_entries.async_initialize()
+        hass.set_state(CoreState.running)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """Stop Home Assistant and undo the patching."""
+        if self.hass is not None:
+            await self.hass.async_stop(force=True)
+        for unpatch in reversed(self._unpatch):
+            unpatch()
+        sys.path.remove(self._tmp.name)
+        for name in [name for name in sys.modules if name.startswith("custom_comp")]:
+            del sys.modules[name]
+        self._tmp.cleanup()
+
+    def _patch_client(self) -> None:
+        """Make the integration build FakeEmeraldHWS clients on the account."""
+        from custom_components.emeraldenergy import helpers
+
+        def _create(*args, **kwargs) -> FakeEmeraldHWS:
+            client = FakeEmeraldHWS(
+                *args, account=self.account, **kwargs, **self.fake_options
+            )
+            self.clients.append(client)
+            return client
+
+        original = helpers._emerald_hws_class
+        helpers._emerald_hws_class = lambda: _create
+        self._unpatch.append(lambda: setattr(helpers, "_emerald_hws_class", original))
+
+    def count_executor_jobs(self) -> Callable[[], int]:
+        """Count jobs sent to Home Assistant's shared executor from now on.
+
+        Returns a function reading the count. The entry's own executor keeps
+        its own count, in entry_data["executor"].completed_jobs.
+        """
+        hass = self.hass
+        original = hass.async_add_executor_job
+        count = 0
+
+        @functools.wraps(original)
+        def _counting(target, *args):
+            nonlocal count
+            count += 1
+            return original(target, *args)
+
+        hass.async_add_executor_job = _counting
+        self._unpatch.append(lambda: setattr(hass, "async_add_executor_job", original))
+        return lambda: count
+
+    async def async_setup_entry(self) -> float:
+        """Add the entry through the config flow; return how long setup took.
+
+        Setup has finished once every unit's water heater is live, not just once
+        the entry has loaded, since connecting runs in the background.
+        """
+        hass = self.hass
+        start = time.perf_counter()
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN,
+            context={"source": "user"},
+            data={
+                CONF_USERNAME: "bench@example.com",
+                CONF_PASSWORD: "bench",
+                "enable_energy_monitoring": self.energy_monitoring,
+                "update_window": self.update_window,
+            },
+        )
+        self.entry = result["result"]
+        await self.async_wait_for(self._all_live)
+        return time.perf_counter() - start
+
+    @property
+    def entry_data(self) -> dict:
+        """Return the integration's data for the entry."""
+        return self.hass.data[DOMAIN][self.entry.entry_id]
+
+    def _all_live(self) -> bool:
+        coordinators = self.entry_data["coordinators"]
+        return len(coordinators) == len(self.account.unit_ids) and all(
+            coordinator.live_snapshot is not None and not coordinator.restored
+            for coordinator in coordinators.values()
+        )
+
+    async def async_wait_for(
+        self, condition: Callable[[], bool], timeout: float | None = 60
+    ) -> None:
+        """Wait until condition holds, checking every millisecond."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not condition():
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError("Condition not met within the timeout")
+            await asyncio.sleep(0.001)
+
+    def entity_ids(self) -> set[str]:
+        """Return the entity IDs of every entity of the entry."""
+        registry = er.async_get(self.hass)
+        return {
+            reg.entity_id
+            for reg in er.async_entries_for_config_entry(registry, self.entry.entry_id)
+        }
+
+    def water_heater_units(self) -> dict[str, str]:
+        """Return the unit UUID of each of the entry's water heater entity IDs."""
+        registry = er.async_get(self.hass)
+        prefix = f"{DOMAIN}_"
+        return {
+            reg.entity_id: reg.unique_id.removeprefix(prefix)
+            for reg in er.async_entries_for_config_entry(registry, self.entry.entry_id)
+            if reg.domain == "water_heater"
+        }
+
+    def listen_state_changes(self, action: Callable[[Event], None]) -> None:
+        """Call action with every state_changed event until the harness stops."""
+        self._unpatch.append(
+            self.hass.bus.async_listen(EVENT_STATE_CHANGED, callback(action))
+        )
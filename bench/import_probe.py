@@ -0,0 +1,80 @@
+"""Time importing the integration in a fresh interpreter.
+
+Run as python3 -m bench.import_probe; prints the result as JSON. Everything the
+integration imports from outside itself is imported first, as Home Assistant
+has long since done by the time it loads the integration, so that only the
+integration's own modules are timed. Modules of the Emerald client library are
+excluded from that, and reported if importing the integration loaded them.
+"""
+
+from __future__ import annotations
+
+import ast
+import importlib
+import json
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = "custom_components.emeraldenergy"
+PACKAGE_DIR = REPO_ROOT / "custom_components" / "emeraldenergy"
+# Only ever to be imported inside executor jobs
+LAZY_MODULES = ("emerald_hws", "awsiot", "awscrt")
+
+
+def _is_lazy(name: str) -> bool:
+    return any(name == lazy or name.startswith(f"{lazy}.") for lazy in LAZY_MODULES)
+
+
+def _dependencies() -> list[str]:
+    """Return every absolute module the integration imports, lazy ones excepted."""
+    names = set()
+    for path in PACKAGE_DIR.glob("*.py"):
+        for node in ast.walk(ast.parse(path.read_text())):
+            if isinstance(node, ast.Import):
+                names.update(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+                names.add(node.module)
+                # The names may be submodules, as in "from ...helpers import event"
+                names.update(f"{node.module}.{alias.name}" for alias in node.names)
+    return sorted(name for name in names if not _is_lazy(name))
+
+
+def main() -> None:
+    """Import the dependencies, then time importing the integration's modules."""
+    sys.path.insert(0, str(REPO_ROOT))
+    for name in _dependencies():
+        try:
+            importlib.import_module(name)
+        except ModuleNotFoundError:
+            # A class or function imported from its module, not a submodule
+            if name.rpartition(".")[0] not in sys.modules:
+                raise
+    already_loaded = {name for name in sys.modules if _is_lazy(name)}
+    modules = [PACKAGE] + sorted(
+        f"{PACKAGE}.{path.stem}"
+        for path in PACKAGE_DIR.glob("*.py")
+        if path.stem != "__init__"
+    )
+    start = time.perf_counter()
+    for name in modules:
+        importlib.import_module(name)
+    elapsed = time.perf_counter() - start
+    print(
+        json.dumps(
+            {
+                "seconds": elapsed,
+                "modules": len(modules),
+                "lazy_loaded": sorted(
+                    name
+                    for name in sys.modules
+                    if _is_lazy(name) and name not in already_loaded
+                ),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,154 +2,581 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
-from collections.abc import Mapping
-from typing import Any
+import threading
+import time
+from collections.abc import Callable, Mapping
+from typing import TYPE_CHECKING, Any
 
-from emerald_hws.emeraldhws import EmeraldHWS
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryError, ConfigEntryNotReady
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import config_validation as cv, issue_registry as ir
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_time_interval
 
-from .const import DOMAIN
-from .helpers import create_hws, is_awscrt_straddle_error
+from .const import (
+    AWSCRT_README_URL,
+    CONF_CONNECTION_TIMEOUT,
+    CONF_ENABLE_ENERGY_MONITORING,
+    CONF_HEALTH_CHECK,
+    CONF_RECORD_MESSAGES,
+    CONF_UPDATE_WINDOW,
+    CONNECT_RETRY_INITIAL,
+    CONNECT_RETRY_MAX,
+    DEFAULT_CONNECTION_TIMEOUT,
+    DEFAULT_ENABLE_ENERGY_MONITORING,
+    DEFAULT_HEALTH_CHECK,
+    DEFAULT_RECORD_MESSAGES,
+    DEFAULT_UPDATE_WINDOW,
+    DISCOVERY_INTERVAL,
+    DOMAIN,
+    SIGNAL_ENERGY_MONITORING,
+    SIGNAL_NEW_UNITS,
+)
+from .coordinator import (
+    EmeraldUnitCoordinator,
+    UnitInfo,
+    UnitSnapshot,
+    async_add_unit_coordinators,
+    async_reconcile_unit_coordinators,
+    discover_new_units,
+    read_units,
+)
+from .executor import EmeraldExecutor
+from .health import EntryHealthMonitor
+from .helpers import (
+    CONNECTION_POOL,
+    SampledDebugLog,
+    create_hws,
+    entry_config,
+    is_awscrt_straddle_error,
+    retune_hws,
+)
+from .recording import StatusRecorder
+from .services import async_setup_services
+from .stats import FANOUT_BUCKETS, Histogram
+from .store import EmeraldStateCache
+
+if TYPE_CHECKING:
+    from emerald_hws.emeraldhws import EmeraldHWS
 
 _LOGGER = logging.getLogger(__name__)
+# Called for every message
+_DISPATCH_LOG = SampledDebugLog(_LOGGER)
 
 # TODO List the platforms that you want to support.
 # For your initial PR, limit it to 1 platform.
 PLATFORMS: list[Platform] = [Platform.WATER_HEATER, Platform.SENSOR]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
 
 class CallbackDispatcher:
-    """Dispatcher to handle multiple callbacks for the same Emerald HWS instance."""
+    """Dispatcher to handle multiple callbacks for the same Emerald HWS instance.
+
+    Callbacks are keyed by the UUID of the unit they belong to, so an update from
+    one unit only wakes that unit's entities. emerald_hws calls its update callback
+    with no arguments, so the unit is recovered from the MQTT topic by attach(),
+    which wraps the instance's message decoder. Updates the dispatcher cannot place
+    -- anything arriving outside a decoded message -- go to every listener.
+
+    Message counts and the time of the last message per unit, the number of
+    times the MQTT connection was established, and the fan-out and duration of
+    every dispatch are kept for diagnostics and the connection health sensors.
+    Every message is also handed to the status recorders added, if any.
+    """
 
     def __init__(self):
         """Initialize the callback dispatcher."""
-        self._callbacks = []
+        self._callbacks: dict[str | None, list[Callable[[], None]]] = {}
+        # Set on the MQTT thread for the duration of one decoded message; see
+        # attach(). A thread-local, because emerald_hws also fires callbacks from
+        # its timer and status-refresh threads, which must not see another
+        # thread's unit.
+        self._local = threading.local()
+        self.started = time.monotonic()
+        self.messages = 0
+        self.unit_messages: dict[str, int] = {}
+        # time.monotonic() of the last message, overall and per unit
+        self.last_message: float | None = None
+        self.unit_last_message: dict[str, float] = {}
+        self.connections = 0
+        self.last_connected: float | None = None
+        self.fanout = Histogram(FANOUT_BUCKETS)
+        self.dispatch_durations = Histogram()
+        # Replaced rather than changed, so the MQTT thread never sees it mid-update
+        self._recorders: tuple[StatusRecorder, ...] = ()
 
-    def register_callback(self, callback):
-        """Register a callback function."""
-        if callback not in self._callbacks:
-            self._callbacks.append(callback)
+    def register_callback(self, callback, hws_uuid=None):
+        """Register a callback function for one unit, or for all units if None."""
+        callbacks = self._callbacks.setdefault(hws_uuid, [])
+        if callback not in callbacks:
+            callbacks.append(callback)
             _LOGGER.debug(
-                f"Registered callback. Total callbacks: {len(self._callbacks)}"
+                f"Registered callback for {hws_uuid}. "
+                f"Total callbacks: {self._callback_count()}"
             )
 
-    def unregister_callback(self, callback):
+    def unregister_callback(self, callback, hws_uuid=None):
         """Unregister a callback function."""
-        if callback in self._callbacks:
-            self._callbacks.remove(callback)
+        callbacks = self._callbacks.get(hws_uuid)
+        if callbacks and callback in callbacks:
+            callbacks.remove(callback)
+            if not callbacks:
+                del self._callbacks[hws_uuid]
             _LOGGER.debug(
-                f"Unregistered callback. Total callbacks: {len(self._callbacks)}"
+                f"Unregistered callback for {hws_uuid}. "
+                f"Total callbacks: {self._callback_count()}"
             )
 
-    def dispatch(self):
-        """Dispatch the callback to all registered listeners."""
-        _LOGGER.debug(f"Dispatching callback to {len(self._callbacks)} listeners")
-        for callback in self._callbacks:
+    def add_recorder(self, recorder: StatusRecorder) -> None:
+        """Start handing every message to recorder."""
+        self._recorders = (*self._recorders, recorder)
+
+    def remove_recorder(self, recorder: StatusRecorder) -> None:
+        """Stop handing messages to recorder."""
+        self._recorders = tuple(r for r in self._recorders if r is not recorder)
+
+    def _callback_count(self) -> int:
+        """Return the number of registered callbacks across all units."""
+        return sum(len(callbacks) for callbacks in self._callbacks.values())
+
+    def attach(self, instance: EmeraldHWS) -> None:
+        """Install this dispatcher as the update callback of an EmeraldHWS instance.
+
+        Every MQTT message reaches emerald_hws's mqttDecodeUpdate with the unit's
+        UUID as the last topic segment, and the library then fires the update
+        callback once per status key in the message. Wrapping the decoder lets the
+        dispatcher note which unit is being decoded, absorb those per-key calls,
+        and dispatch once to that unit when the message has been applied.
+
+        The connection success handler is wrapped too, to count connections.
+        emerald_hws hands it to each MQTT client it builds, so this has to happen
+        before connecting.
+        """
+        decode = instance.mqttDecodeUpdate
+        on_connection_success = instance.on_lifecycle_connection_success
+
+        def _decode_and_dispatch(topic, payload):
+            self._local.hws_uuid = hws_uuid = topic.split("/")[-1]
+            self.messages += 1
+            self.unit_messages[hws_uuid] = self.unit_messages.get(hws_uuid, 0) + 1
+            self.last_message = self.unit_last_message[hws_uuid] = time.monotonic()
+            for recorder in self._recorders:
+                recorder.record(topic, payload)
+            self._local.pending = False
             try:
-                callback()
+                decode(topic, payload)
+            finally:
+                hws_uuid = self._local.hws_uuid
+                pending = self._local.pending
+                self._local.hws_uuid = None
+                self._local.pending = False
+                # In finally so a message that failed half way through decoding
+                # still publishes the keys it did apply.
+                if pending:
+                    self.dispatch(hws_uuid)
+
+        def _count_connection(data):
+            self.connections += 1
+            self.last_connected = time.monotonic()
+            return on_connection_success(data)
+
+        instance.mqttDecodeUpdate = _decode_and_dispatch
+        instance.on_lifecycle_connection_success = _count_connection
+        instance.replaceCallback(self)
+
+    def dispatch(self, hws_uuid=None):
+        """Dispatch the callback to the listeners of one unit, or to all of them.
+
+        Listeners registered without a unit are called for every dispatch.
+        """
+        if hws_uuid is None:
+            callbacks = [cb for cbs in self._callbacks.values() for cb in cbs]
+        else:
+            # Copies, so a callback that unregisters itself cannot disturb the loop.
+            callbacks = [
+                *self._callbacks.get(hws_uuid, ()),
+                *self._callbacks.get(None, ()),
+            ]
+        _DISPATCH_LOG(
+            "Dispatching callback for %s to %d listeners",
+            hws_uuid or "all units",
+            len(callbacks),
+        )
+        start = time.perf_counter()
+        for update_callback in callbacks:
+            try:
+                update_callback()
             except Exception:
-                _LOGGER.exception("Error in callback %r", callback)
+                _LOGGER.exception("Error in callback %r", update_callback)
+        self.dispatch_durations.add(time.perf_counter() - start)
+        self.fanout.add(len(callbacks))
 
     def __call__(self):
-        """Make the dispatcher callable."""
+        """Make the dispatcher callable.
+
+        Inside a decoded message this only marks the message's unit as changed;
+        attach() dispatches once the whole message has been applied.
+        """
+        if getattr(self._local, "hws_uuid", None) is not None:
+            self._local.pending = True
+            return
         self.dispatch()
 
 
-def _create_and_connect(config: Mapping[str, Any]) -> EmeraldHWS:
-    """Build an EmeraldHWS client and open its connection.
+def _connect_and_discover(
+    config: Mapping[str, Any],
+    callback_dispatcher: CallbackDispatcher,
+    timings: dict[str, float],
+) -> tuple[EmeraldHWS, dict[str, tuple[UnitInfo, UnitSnapshot | None]]]:
+    """Build an EmeraldHWS client, open its connection and discover its units.
+
+    Blocking, and every step reaches into awsiotsdk/awscrt or the cloud, so they
+    run as a single job on the entry's executor rather than several. The
+    dispatcher is attached before connecting so that no status message is missed
+    between discovery and the coordinators taking over.
 
-    Blocking, and both halves reach into awsiotsdk/awscrt, so they run as a single
-    executor job rather than two.
+    A connection that fails part way may already have started MQTT threads and
+    timers, so it is disconnected before the error is re-raised. The time each
+    step took is recorded in timings.
     """
+    start = time.monotonic()
     instance = create_hws(config)
-    instance.connect()
-    return instance
+    callback_dispatcher.attach(instance)
+    timings["create"] = time.monotonic() - start
+    try:
+        start = time.monotonic()
+        instance.connect()
+        timings["connect"] = time.monotonic() - start
+        start = time.monotonic()
+        units = read_units(instance)
+        timings["discovery"] = time.monotonic() - start
+        return instance, units
+    except BaseException:
+        try:
+            instance.disconnect()
+        except Exception:
+            # Never replace the failure that triggered the cleanup.
+            _LOGGER.exception("Failed to disconnect after a failed connection")
+        raise
 
 
-async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Set up Emerald Hot Water System from a config entry."""
-    hass.data.setdefault(DOMAIN, {})
+@callback
+def _disconnect_abandoned(hass: HomeAssistant, future: asyncio.Future) -> None:
+    """Disconnect a connection that completed after its setup was cancelled."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    instance, _units = future.result()
+    hass.async_add_executor_job(instance.disconnect)
+
 
-    # Create and store the EmeraldHWS instance for shared access
+async def _async_open_connection(
+    hass: HomeAssistant, entry: ConfigEntry, entry_data: dict
+) -> tuple[EmeraldHWS, dict[str, tuple[UnitInfo, UnitSnapshot | None]]]:
+    """Connect a new client for the entry's account and discover its units."""
+    timings = entry_data["setup_timings"]
+    timings["connect_attempts"] = timings.get("connect_attempts", 0) + 1
+    # Nothing else runs on the executor before this succeeds, so it is never
+    # rejected as full.
+    future = entry_data["executor"].async_add_job(
+        _connect_and_discover,
+        entry_data["config"],
+        entry_data["dispatcher"],
+        timings,
+    )
     try:
-        emerald_hws_instance = await hass.async_add_executor_job(
-            _create_and_connect, entry.data
+        # Shielded: cancelling the executor future would not stop the thread,
+        # only lose the connection it returns.
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # The entry is being unloaded mid-connect. The thread will finish
+        # regardless, so hand its connection back when it does.
+        future.add_done_callback(lambda f: _disconnect_abandoned(hass, f))
+        raise
+
+
+async def _async_connect(
+    hass: HomeAssistant, entry: ConfigEntry, entry_data: dict
+) -> None:
+    """Connect to the Emerald cloud in the background, retrying with backoff.
+
+    Setup does not wait for this: entities are already up, restored from the
+    cache or unavailable, and become live once it completes. An entry whose
+    account another entry has already connected takes over that connection
+    and only reads its units.
+    """
+    retry_delay = CONNECT_RETRY_INITIAL
+    shared = entry_data["connection"]
+    while True:
+        try:
+            async with shared.lock:
+                if shared.instance is None:
+                    shared.instance, units = await _async_open_connection(
+                        hass, entry, entry_data
+                    )
+                else:
+                    units = await entry_data["executor"].async_add_job(
+                        read_units, shared.instance
+                    )
+                emerald_hws_instance = shared.instance
+        except Exception as err:
+            # emerald_hws raises bare Exceptions, and its awsiotsdk/awscrt stack can
+            # fail in ways only the traceback identifies, so log the full trace
+            # rather than just the message.
+            _LOGGER.exception("Failed to create Emerald HWS API instance")
+            if is_awscrt_straddle_error(err):
+                # Unrecoverable until Home Assistant restarts, so stop retrying and
+                # raise a repair with the remedy. See is_awscrt_straddle_error.
+                ir.async_create_issue(
+                    hass,
+                    DOMAIN,
+                    f"awscrt_straddle_{entry.entry_id}",
+                    is_fixable=False,
+                    severity=ir.IssueSeverity.ERROR,
+                    translation_key="awscrt_straddle",
+                    translation_placeholders={"error": str(err)},
+                    learn_more_url=AWSCRT_README_URL,
+                )
+                return
+            # Anything else is assumed transient, so retry with backoff.
+            _LOGGER.warning(
+                f"Failed to connect to the Emerald cloud, retrying in "
+                f"{retry_delay} seconds: {err}"
+            )
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, CONNECT_RETRY_MAX)
+            continue
+        break
+
+    entry_data["instance"] = emerald_hws_instance
+    _LOGGER.info("Emerald HWS API instance connected and stored")
+    added = async_reconcile_unit_coordinators(hass, entry_data, units)
+    if added:
+        async_dispatcher_send(hass, SIGNAL_NEW_UNITS.format(entry.entry_id), added)
+
+
+async def _async_discover_new_units(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Pick up units added to the account since setup, without a reload."""
+    entry_data = hass.data[DOMAIN].get(entry.entry_id)
+    if not entry_data or entry_data["instance"] is None:
+        # Not connected yet; connecting discovers every unit anyway.
+        return
+    try:
+        units = await entry_data["executor"].async_add_job(
+            discover_new_units,
+            entry_data["instance"],
+            entry_data["config"],
+            set(entry_data["coordinators"]),
         )
     except Exception as err:
-        # emerald_hws raises bare Exceptions, and its awsiotsdk/awscrt stack can fail
-        # in ways only the traceback identifies, so log the full trace rather than
-        # just the message.
-        _LOGGER.exception("Failed to create Emerald HWS API instance")
-        if is_awscrt_straddle_error(err):
-            # Unrecoverable until Home Assistant restarts, so fail permanently
-            # with the remedy rather than looping. See is_awscrt_straddle_error.
-            raise ConfigEntryError(
-                "The installed awscrt package is a mix of two versions, so the "
-                "connection to the Emerald cloud cannot be established in this "
-                "Home Assistant process. Restart Home Assistant to clear it. See "
-                "the integration README section 'Errors mentioning awscrt during "
-                f"setup' if it persists. Underlying error: {err}"
-            ) from err
-        # Anything else is assumed transient, so let HA retry with backoff.
-        raise ConfigEntryNotReady(
-            f"Failed to connect to the Emerald cloud: {err}"
-        ) from err
-
-    # Past this point the instance holds a live MQTT connection with its own threads
-    # and timers, so anything that fails has to hand it back before HA retries setup.
-    try:
-        # Create and store callback dispatcher for this instance
-        callback_dispatcher = CallbackDispatcher()
-        emerald_hws_instance.replaceCallback(callback_dispatcher)
-
-        # Store both the instance and dispatcher for platforms to access
-        hass.data[DOMAIN][entry.entry_id] = {
-            "instance": emerald_hws_instance,
-            "dispatcher": callback_dispatcher,
-        }
-        _LOGGER.info(
-            "Emerald HWS API instance and callback dispatcher created and stored"
+        # Retried at the next interval; the units already set up are unaffected.
+        _LOGGER.warning(f"Failed to check the Emerald account for new units: {err}")
+        return
+    if added := async_add_unit_coordinators(hass, entry_data, units):
+        _LOGGER.info(f"Discovered {len(added)} new Emerald HWS units")
+        async_dispatcher_send(hass, SIGNAL_NEW_UNITS.format(entry.entry_id), added)
+
+
+def _shutdown_coordinators(entry_data: dict) -> None:
+    """Detach every unit coordinator of an entry, then stop its executor."""
+    for coordinator in entry_data.get("coordinators", {}).values():
+        coordinator.async_shutdown()
+    entry_data["executor"].async_shutdown()
+
+
+@callback
+def _async_set_recording(entry_data: dict, size: int) -> None:
+    """Start, resize or stop recording the status messages of the entry's connection.
+
+    A recorder that is resized keeps the messages it has, as many as fit.
+    """
+    dispatcher = entry_data["dispatcher"]
+    previous = entry_data.get("recorder")
+    recorder = StatusRecorder(size, previous) if size > 0 else None
+    if recorder is not None:
+        dispatcher.add_recorder(recorder)
+    if previous is not None:
+        dispatcher.remove_recorder(previous)
+    entry_data["recorder"] = recorder
+
+
+async def _async_release_connection(hass: HomeAssistant, entry_data: dict) -> None:
+    """Give up the entry's share of its account's connection.
+
+    The connection is disconnected once no entry for the account is left.
+    """
+    instance = CONNECTION_POOL.release(entry_data["connection"])
+    if instance is not None:
+        # The entry's executor is shut down by now, and may be stuck behind
+        # publishes to a dead connection anyway.
+        await hass.async_add_executor_job(instance.disconnect)
+
+
+async def async_setup(hass: HomeAssistant, config: dict) -> bool:
+    """Set up the services of the Emerald Hot Water System integration."""
+    async_setup_services(hass)
+    return True
+
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Set up Emerald Hot Water System from a config entry."""
+    hass.data.setdefault(DOMAIN, {})
+
+    # The last known details and state of every unit, so that entities have
+    # values before the first status message arrives from the cloud
+    coordinators: dict[str, EmeraldUnitCoordinator] = {}
+    cache = EmeraldStateCache(hass, entry.entry_id, coordinators)
+    start = time.monotonic()
+    cached_units = await cache.async_load()
+    # How long each phase of setup took (seconds), for diagnostics
+    setup_timings = {"cache_load": time.monotonic() - start}
+
+    # The instance is filled in by _async_connect once the cloud connection is up;
+    # the dispatcher exists from the start so the coordinators can register. Both
+    # are shared with any other entry for the same account.
+    config = entry_config(entry)
+    connection = CONNECTION_POOL.acquire(config, CallbackDispatcher)
+    if not connection.uses_password(config):
+        # Most likely a stale entry left behind after the password was changed
+        _LOGGER.warning(
+            f"Config entry {entry.title} shares its Emerald account's connection "
+            "with another entry that has a different password, and only one of "
+            "the two is used. Remove the entry with the outdated password."
         )
+    entry_data = hass.data[DOMAIN][entry.entry_id] = {
+        # The entry's data with its options applied; see _async_update_options
+        "config": config,
+        "instance": None,
+        "connection": connection,
+        "dispatcher": connection.dispatcher,
+        # Every blocking emerald_hws call for the entry runs here
+        "executor": EmeraldExecutor(hass),
+        # Per-unit coordinators, holding each unit's details and state
+        "coordinators": coordinators,
+        "cache": cache,
+        "update_window": config.get(CONF_UPDATE_WINDOW, DEFAULT_UPDATE_WINDOW),
+        "setup_timings": setup_timings,
+    }
+    entry_data["health"] = EntryHealthMonitor(
+        hass,
+        entry_data,
+        config.get(CONF_HEALTH_CHECK, DEFAULT_HEALTH_CHECK) * 60,
+    )
+    # Off unless asked for; see StatusRecorder
+    _async_set_recording(
+        entry_data, config.get(CONF_RECORD_MESSAGES, DEFAULT_RECORD_MESSAGES)
+    )
+
+    # Start every known unit from the cache. Their entities show the restored
+    # state until _async_connect reconciles them with live data, and units the
+    # cache does not know are added once discovered.
+    async_add_unit_coordinators(hass, entry_data, cached_units, restored=True)
 
+    try:
+        start = time.monotonic()
         await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+        setup_timings["entity_build"] = time.monotonic() - start
     except BaseException:
-        # BaseException, not Exception: HA cancels in-flight setup tasks on shutdown
-        # and when a reload races setup, and CancelledError would otherwise skip the
-        # disconnect below and strand the MQTT threads. Nothing is swallowed -- the
-        # bare raise at the end re-raises whatever arrived, cancellation included.
-        _LOGGER.warning(
-            "Emerald HWS setup did not complete after the connection was "
-            "established; disconnecting so nothing is left holding MQTT threads"
-        )
-        # Nothing in this block may raise: hass.data[DOMAIN] is set up above, but a
-        # subscript here would mask the real failure if that ever stopped holding.
-        hass.data.get(DOMAIN, {}).pop(entry.entry_id, None)
-        try:
-            # The executor job is submitted as soon as this is called, so disconnect
-            # still runs on its thread even if cancellation interrupts the await.
-            await hass.async_add_executor_job(emerald_hws_instance.disconnect)
-        except Exception:
-            # Cleanup must never replace the failure that triggered it, so this is
-            # logged and swallowed; the bare raise below re-raises the real cause.
-            _LOGGER.exception(
-                "Failed to disconnect the Emerald HWS instance during cleanup"
-            )
+        # This entry has connected nothing yet, so there is only the entry data
+        # to drop -- and its share of the account's connection.
+        hass.data[DOMAIN].pop(entry.entry_id, None)
+        _async_set_recording(entry_data, 0)
+        _shutdown_coordinators(entry_data)
+        await _async_release_connection(hass, entry_data)
         raise
 
+    entry_data["connect_task"] = entry.async_create_background_task(
+        hass,
+        _async_connect(hass, entry, entry_data),
+        f"{DOMAIN} connect {entry.entry_id}",
+    )
+
+    async def _async_rediscover(_now) -> None:
+        await _async_discover_new_units(hass, entry)
+
+    entry.async_on_unload(
+        async_track_time_interval(hass, _async_rediscover, DISCOVERY_INTERVAL)
+    )
+    entry.async_on_unload(entry_data["health"].async_start())
+    entry.async_on_unload(entry.add_update_listener(_async_update_options))
+
     return True
 
 
+async def _async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options to the running entry, without reloading it.
+
+    Reloading would disconnect and reconnect the cloud connection and rebuild
+    every entity. Instead the connection's periods are retuned in place, the
+    health window, coalescing window and status recorder take effect at once,
+    and turning energy monitoring on or off only adds or removes the energy
+    sensors.
+    """
+    entry_data = hass.data[DOMAIN].get(entry.entry_id)
+    if not entry_data:
+        return
+    old, new = entry_data["config"], entry_config(entry)
+    entry_data["config"] = new
+
+    def changed(key: str, default: Any) -> bool:
+        return old.get(key, default) != new.get(key, default)
+
+    if changed(CONF_UPDATE_WINDOW, DEFAULT_UPDATE_WINDOW):
+        entry_data["update_window"] = new.get(CONF_UPDATE_WINDOW, DEFAULT_UPDATE_WINDOW)
+        for coordinator in entry_data["coordinators"].values():
+            coordinator.async_set_update_window(entry_data["update_window"])
+    if changed(CONF_HEALTH_CHECK, DEFAULT_HEALTH_CHECK):
+        entry_data["health"].async_set_health_window(
+            new.get(CONF_HEALTH_CHECK, DEFAULT_HEALTH_CHECK) * 60
+        )
+    if changed(CONF_RECORD_MESSAGES, DEFAULT_RECORD_MESSAGES):
+        _async_set_recording(
+            entry_data, new.get(CONF_RECORD_MESSAGES, DEFAULT_RECORD_MESSAGES)
+        )
+    if changed(CONF_ENABLE_ENERGY_MONITORING, DEFAULT_ENABLE_ENERGY_MONITORING):
+        async_dispatcher_send(
+            hass,
+            SIGNAL_ENERGY_MONITORING.format(entry.entry_id),
+            new.get(CONF_ENABLE_ENERGY_MONITORING, DEFAULT_ENABLE_ENERGY_MONITORING),
+        )
+    if (
+        changed(CONF_CONNECTION_TIMEOUT, DEFAULT_CONNECTION_TIMEOUT)
+        or changed(CONF_HEALTH_CHECK, DEFAULT_HEALTH_CHECK)
+    ) and (instance := entry_data["instance"]) is not None:
+        # Not yet connected, the connection is built with the new settings anyway.
+        try:
+            retuned = await entry_data["executor"].async_add_job(
+                retune_hws, instance, new
+            )
+        except Exception as err:
+            _LOGGER.warning(f"Failed to apply the new connection settings: {err}")
+            return
+        if not retuned:
+            _LOGGER.info(
+                "A connection check that was turned off stays off until Home "
+                "Assistant next connects to the Emerald cloud"
+            )
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         # Clean up stored EmeraldHWS instance and stop MQTT/timers
         entry_data = hass.data[DOMAIN].pop(entry.entry_id, None)
         if entry_data:
-            instance = entry_data["instance"]
-            await hass.async_add_executor_job(instance.disconnect)
+            _async_set_recording(entry_data, 0)
+            _shutdown_coordinators(entry_data)
+            # A connection still being made is disconnected by _async_connect
+            # when its cancellation lands; see _disconnect_abandoned.
+            entry_data["connect_task"].cancel()
+            await _async_release_connection(hass, entry_data)
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the state cache of a removed config entry."""
+    await EmeraldStateCache(hass, entry.entry_id, {}).async_remove()
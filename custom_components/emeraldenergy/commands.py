@@ -0,0 +1,300 @@
+"""Per-unit command pipeline for the Emerald Hot Water System integration."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import replace
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.components.water_heater import (
+    STATE_ECO,
+    STATE_HEAT_PUMP,
+    STATE_OFF,
+    STATE_PERFORMANCE,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from .stats import Histogram
+
+if TYPE_CHECKING:
+    from .coordinator import EmeraldUnitCoordinator, UnitSnapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+# How long a sent command may go unreported by the unit before its optimistic
+# state is dropped (seconds). Longer than emerald_hws' 20 second publish timeout,
+# so that only a command the broker accepted can time out this way.
+ECHO_TIMEOUT = 30
+
+# Snapshot fields a command can set, in the order they are sent: a unit has to
+# be on before a mode change means anything.
+_FIELDS = ("is_on", "mode")
+_ACTIONS = {
+    ("is_on", True): ("turn on", "turnOn"),
+    ("is_on", False): ("turn off", "turnOff"),
+    ("mode", 0): ("boost mode", "setBoostMode"),
+    ("mode", 1): ("normal mode", "setNormalMode"),
+    ("mode", 2): ("quiet mode", "setQuietMode"),
+}
+
+# The Emerald mode of each Home Assistant operation mode but off
+OPERATION_MODES = {STATE_HEAT_PUMP: 1, STATE_PERFORMANCE: 0, STATE_ECO: 2}
+
+
+def _call_hws(action: str, func, *args) -> None:
+    """Run a blocking emerald_hws control call, translating failures for HASS.
+
+    Control commands are MQTT publishes that block until the broker acknowledges
+    them. If the connection to the Emerald cloud has dropped, the publish is
+    queued rather than delivered and the call raises TimeoutError after 20
+    seconds. Let that surface as a HomeAssistantError so the service call fails
+    cleanly instead of logging an unexpected-error traceback.
+    """
+    try:
+        func(*args)
+    except TimeoutError as err:
+        raise HomeAssistantError(
+            f"Timed out sending '{action}' to the Emerald hot water system. "
+            "The connection to the Emerald cloud may be down; the command was "
+            "not applied."
+        ) from err
+    except Exception as err:
+        # emerald_hws raises bare Exceptions for an unknown unit or a missing
+        # MQTT client, so there is no narrower type to catch here.
+        raise HomeAssistantError(
+            f"Failed to send '{action}' to the Emerald hot water system: {err}"
+        ) from err
+
+
+class UnitCommandQueue:
+    """Send one unit's commands one at a time, newest request winning.
+
+    Requests describe the state the unit should reach rather than the publishes
+    to get there. A request made while an earlier one is still waiting merges
+    into it, and both callers wait for the merged command; a command being sent
+    stops between publishes once a newer request is waiting, leaving the rest to
+    it. Before each publish the field is compared with what the unit last
+    reported, or was last sent, and skipped if it already matches.
+
+    Requested values are shown at once, overlaid on the unit's live snapshot,
+    and stay overlaid once sent until the unit's status echoes them back or
+    ECHO_TIMEOUT passes. The time from sending to the broker's acknowledgement,
+    and to the echo being rendered, is kept for diagnostics.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinator: EmeraldUnitCoordinator):
+        """Initialize the queue for the coordinator's unit."""
+        self._hass = hass
+        self._coordinator = coordinator
+        # Values asked for but not yet sent, by snapshot field
+        self._requested: dict[str, Any] = {}
+        # Values sent but not yet reported back, with when they were sent
+        self._sent: dict[str, tuple[Any, float]] = {}
+        self._echo_timers: dict[str, asyncio.TimerHandle] = {}
+        # Resolved once the waiting request has been sent or superseded
+        self._pending: asyncio.Future | None = None
+        self._worker: asyncio.Task | None = None
+        self.sent_commands = 0
+        self.superseded_commands = 0
+        self.skipped_commands = 0
+        self.failed_commands = 0
+        # Publishes the broker never acknowledged; see _call_hws
+        self.publish_timeouts = 0
+        self.echo_timeouts = 0
+        # time.monotonic() when the broker last acknowledged a command
+        self.last_success: float | None = None
+        self.ack_latency = Histogram()
+        self.echo_latency = Histogram()
+
+    async def async_request(self, is_on: bool, mode: int | None = None) -> None:
+        """Ask for the unit to be on or off, and in mode unless None.
+
+        Returns once the command has been sent, skipped or superseded, and raises
+        HomeAssistantError if a publish fails, or sending fails in any other way.
+        Turning the unit off drops any mode change still waiting to be sent.
+        """
+        if self._coordinator.emerald_hws is None:
+            raise HomeAssistantError(
+                "Not connected to the Emerald cloud yet; the command was not applied."
+            )
+        targets: dict[str, Any] = {"is_on": is_on}
+        if is_on and mode is not None:
+            targets["mode"] = mode
+        if is_on:
+            targets = {**self._requested, **targets}
+        self._requested = targets
+
+        if self._pending is None:
+            self._pending = self._hass.loop.create_future()
+        else:
+            self.superseded_commands += 1
+        future = self._pending
+        self._coordinator.async_update_optimistic()
+
+        if self._worker is None:
+            self._worker = self._hass.async_create_task(self._async_run())
+        # Shielded: a caller giving up must not fail the others sharing the future.
+        await asyncio.shield(future)
+
+    async def async_request_operation(self, operation_mode: str) -> None:
+        """Ask for the unit to be in a Home Assistant operation mode.
+
+        Off turns the unit off; any other mode turns it on in that mode.
+        """
+        if operation_mode == STATE_OFF:
+            await self.async_request(is_on=False)
+        else:
+            await self.async_request(
+                is_on=True, mode=OPERATION_MODES.get(operation_mode)
+            )
+
+    async def _async_run(self) -> None:
+        """Send waiting requests until there are none left."""
+        try:
+            while (future := self._pending) is not None:
+                self._pending = None
+                try:
+                    await self._async_send()
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except Exception as err:
+                    if not isinstance(err, HomeAssistantError):
+                        # A bug or a shut-down executor rather than a failed
+                        # publish; still fail the callers rather than leave them
+                        # waiting, and carry on with any newer request.
+                        _LOGGER.exception(
+                            f"Unexpected error sending a command to "
+                            f"{self._coordinator.hws_uuid}"
+                        )
+                        failure = HomeAssistantError(
+                            f"Failed to send a command to the Emerald hot water "
+                            f"system: {err}"
+                        )
+                        failure.__cause__ = err
+                        err = failure
+                    if self._pending is None:
+                        # Nothing newer wants these values; stop showing them.
+                        self._requested.clear()
+                        self._coordinator.async_update_optimistic()
+                    future.set_exception(err)
+                else:
+                    future.set_result(None)
+        finally:
+            self._worker = None
+
+    def _believed(self, field: str) -> Any:
+        """Return the value the unit is believed to have, or None if unknown."""
+        if field in self._sent:
+            return self._sent[field][0]
+        snapshot = self._coordinator.live_snapshot
+        if snapshot is None or self._coordinator.restored:
+            # Cached state may be stale, so never skip a command because of it.
+            return None
+        return getattr(snapshot, field)
+
+    async def _async_send(self) -> None:
+        """Publish each requested field that differs from the believed state."""
+        hws_uuid = self._coordinator.hws_uuid
+        for field in _FIELDS:
+            if self._pending is not None:
+                # A newer request is waiting and sends whatever is still needed.
+                return
+            if field not in self._requested:
+                continue
+            value = self._requested.pop(field)
+            if self._believed(field) == value:
+                self.skipped_commands += 1
+                continue
+
+            # Read per publish: the coordinator may have lost its client since
+            # the request was queued.
+            if (instance := self._coordinator.emerald_hws) is None:
+                self.failed_commands += 1
+                raise HomeAssistantError(
+                    "Not connected to the Emerald cloud; the command was not applied."
+                )
+            action, method = _ACTIONS[(field, value)]
+            sent_at = time.monotonic()
+            self._sent[field] = (value, sent_at)
+            self._async_start_echo_timer(field, sent_at)
+            try:
+                await self._coordinator.executor.async_add_job(
+                    _call_hws, action, getattr(instance, method), hws_uuid
+                )
+            except Exception as err:
+                self.failed_commands += 1
+                if isinstance(err.__cause__, TimeoutError):
+                    self.publish_timeouts += 1
+                self._async_forget_sent(field, sent_at)
+                raise
+            self.sent_commands += 1
+            self.last_success = time.monotonic()
+            self.ack_latency.add(self.last_success - sent_at)
+
+    @callback
+    def _async_start_echo_timer(self, field: str, sent_at: float) -> None:
+        """Give up on the echo of a sent field after ECHO_TIMEOUT seconds."""
+        if (timer := self._echo_timers.pop(field, None)) is not None:
+            timer.cancel()
+        self._echo_timers[field] = self._hass.loop.call_later(
+            ECHO_TIMEOUT, self._async_echo_timed_out, field, sent_at
+        )
+
+    @callback
+    def _async_echo_timed_out(self, field: str, sent_at: float) -> None:
+        """Drop a sent value the unit never reported back."""
+        if field not in self._sent or self._sent[field][1] != sent_at:
+            return
+        self.echo_timeouts += 1
+        _LOGGER.warning(
+            f"Emerald HWS unit {self._coordinator.hws_uuid} did not report {field} "
+            f"within {ECHO_TIMEOUT} seconds of the command; showing its last "
+            "reported state"
+        )
+        self._async_forget_sent(field, sent_at)
+        self._coordinator.async_update_optimistic()
+
+    @callback
+    def _async_forget_sent(self, field: str, sent_at: float) -> None:
+        """Stop waiting for the echo of a sent value, if it is still the latest."""
+        if field not in self._sent or self._sent[field][1] != sent_at:
+            return
+        del self._sent[field]
+        if (timer := self._echo_timers.pop(field, None)) is not None:
+            timer.cancel()
+
+    @callback
+    def async_observe(self, snapshot: UnitSnapshot) -> None:
+        """Confirm every sent value a live snapshot reports back."""
+        for field, (value, sent_at) in list(self._sent.items()):
+            if getattr(snapshot, field) == value:
+                self.echo_latency.add(time.monotonic() - sent_at)
+                self._async_forget_sent(field, sent_at)
+
+    @callback
+    def async_overlay(self, snapshot: UnitSnapshot | None) -> UnitSnapshot | None:
+        """Return a live snapshot with the requested and unconfirmed values shown."""
+        if snapshot is None:
+            return None
+        changes = {field: value for field, (value, _) in self._sent.items()}
+        changes.update(self._requested)
+        return replace(snapshot, **changes) if changes else snapshot
+
+    @callback
+    def async_shutdown(self) -> None:
+        """Abandon every waiting and unconfirmed command."""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        for timer in self._echo_timers.values():
+            timer.cancel()
+        self._echo_timers.clear()
+        self._requested.clear()
+        self._sent.clear()
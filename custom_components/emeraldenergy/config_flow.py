@@ -10,7 +10,7 @@ import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
 
@@ -19,11 +19,16 @@ from .const import (
     CONF_CONNECTION_TIMEOUT,
     CONF_HEALTH_CHECK,
     CONF_ENABLE_ENERGY_MONITORING,
+    CONF_RECORD_MESSAGES,
+    CONF_UPDATE_WINDOW,
     DEFAULT_CONNECTION_TIMEOUT,
     DEFAULT_HEALTH_CHECK,
     DEFAULT_ENABLE_ENERGY_MONITORING,
+    DEFAULT_RECORD_MESSAGES,
+    DEFAULT_UPDATE_WINDOW,
+    MAX_RECORD_MESSAGES,
 )
-from .helpers import create_hws
+from .helpers import create_hws, entry_config
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -36,6 +41,9 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
         vol.Optional(
             CONF_ENABLE_ENERGY_MONITORING, default=DEFAULT_ENABLE_ENERGY_MONITORING
         ): bool,
+        vol.Optional(CONF_UPDATE_WINDOW, default=DEFAULT_UPDATE_WINDOW): vol.All(
+            int, vol.Range(min=0)
+        ),
     }
 )
 
@@ -71,6 +79,14 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> OptionsFlowHandler:
+        """Return the options flow for an entry."""
+        return OptionsFlowHandler()
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -94,6 +110,52 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         )
 
 
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Retune a running entry's connection settings.
+
+    The options are applied to the running entry in place, without a reload;
+    see _async_update_options in __init__.
+    """
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Show the current settings for editing."""
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+
+        config = entry_config(self.config_entry)
+        schema = vol.Schema(
+            {
+                vol.Optional(
+                    CONF_CONNECTION_TIMEOUT,
+                    default=config.get(
+                        CONF_CONNECTION_TIMEOUT, DEFAULT_CONNECTION_TIMEOUT
+                    ),
+                ): vol.All(int, vol.Range(min=0)),
+                vol.Optional(
+                    CONF_HEALTH_CHECK,
+                    default=config.get(CONF_HEALTH_CHECK, DEFAULT_HEALTH_CHECK),
+                ): vol.All(int, vol.Range(min=0)),
+                vol.Optional(
+                    CONF_ENABLE_ENERGY_MONITORING,
+                    default=config.get(
+                        CONF_ENABLE_ENERGY_MONITORING, DEFAULT_ENABLE_ENERGY_MONITORING
+                    ),
+                ): bool,
+                vol.Optional(
+                    CONF_UPDATE_WINDOW,
+                    default=config.get(CONF_UPDATE_WINDOW, DEFAULT_UPDATE_WINDOW),
+                ): vol.All(int, vol.Range(min=0)),
+                vol.Optional(
+                    CONF_RECORD_MESSAGES,
+                    default=config.get(CONF_RECORD_MESSAGES, DEFAULT_RECORD_MESSAGES),
+                ): vol.All(int, vol.Range(min=0, max=MAX_RECORD_MESSAGES)),
+            }
+        )
+        return self.async_show_form(step_id="init", data_schema=schema)
+
+
 class CannotConnect(HomeAssistantError):
     """Error to indicate we cannot connect."""
 
@@ -1,15 +1,60 @@
 """Constants for the Emerald Hot Water System integration."""
 
+from datetime import timedelta
+
 DOMAIN = "emeraldenergy"
 
+# Sent with the new unit coordinators when re-discovery finds units; format with
+# the config entry ID
+SIGNAL_NEW_UNITS = f"{DOMAIN}_new_units_{{}}"
+
+# Sent at local midnight to reset the daily energy sensors; format with the
+# config entry ID
+SIGNAL_MIDNIGHT = f"{DOMAIN}_midnight_{{}}"
+
+# Sent with the new setting when energy monitoring is turned on or off in the
+# options; format with the config entry ID
+SIGNAL_ENERGY_MONITORING = f"{DOMAIN}_energy_monitoring_{{}}"
+
+# How often the account is checked for units added since setup
+DISCOVERY_INTERVAL = timedelta(hours=6)
+
+# How often the connection health sensors and unit availability are refreshed
+HEALTH_UPDATE_INTERVAL = timedelta(seconds=30)
+
+# Backoff between attempts to connect to the Emerald cloud, in seconds
+CONNECT_RETRY_INITIAL = 10
+CONNECT_RETRY_MAX = 600
+
+# How many units the set_mode service commands at once, by default and at most
+DEFAULT_BULK_COMMANDS = 8
+MAX_BULK_COMMANDS = 16
+
+# Lines logged for every message are logged once in this many; see
+# SampledDebugLog
+LOG_SAMPLE_EVERY = 100
+
+# The most status messages a recorder may keep; each is typically a few hundred
+# bytes
+MAX_RECORD_MESSAGES = 50000
+
+AWSCRT_README_URL = (
+    "https://github.com/ross-w/emerald-hws-ha/blob/main/README.md"
+    "#errors-mentioning-awscrt-during-setup"
+)
+
 # Configuration constants
 CONF_USERNAME = "username"
 CONF_PASSWORD = "password"
 CONF_CONNECTION_TIMEOUT = "connection_timeout"
 CONF_HEALTH_CHECK = "health_check"
 CONF_ENABLE_ENERGY_MONITORING = "enable_energy_monitoring"
+CONF_UPDATE_WINDOW = "update_window"
+CONF_RECORD_MESSAGES = "record_messages"
 
 # Default values
 DEFAULT_CONNECTION_TIMEOUT = 720  # 12 hours in minutes
 DEFAULT_HEALTH_CHECK = 60  # 1 hour in minutes
 DEFAULT_ENABLE_ENERGY_MONITORING = True
+DEFAULT_UPDATE_WINDOW = 2  # seconds; 0 writes every update straight away
+DEFAULT_RECORD_MESSAGES = 0  # status messages kept for export; 0 to disable
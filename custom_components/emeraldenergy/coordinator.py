@@ -0,0 +1,542 @@
+"""Per-unit state coordination for the Emerald Hot Water System integration."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass, field, fields
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .commands import UnitCommandQueue
+from .helpers import create_hws
+from .tank import TankMetrics
+
+if TYPE_CHECKING:
+    from emerald_hws.emeraldhws import EmeraldHWS
+
+    from .executor import EmeraldExecutor
+    from .store import EmeraldStateCache
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _intern(value):
+    """Return value interned if it is a string, so that equal strings share memory."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass(frozen=True, slots=True)
+class UnitSnapshot:
+    """Everything the entities of one unit render, read from emerald_hws at once.
+
+    Immutable, so the one snapshot is shared by the coordinator and every entity
+    of the unit rather than copied into each.
+    """
+
+    current_temperature: float | None
+    target_temperature: float | None
+    is_on: bool
+    mode: int | None
+    is_heating: bool
+    daily_energy: float | None
+    # The last hourly energy reading: its emerald_hws timestamp and kWh. Last, and
+    # defaulted, so that snapshots cached before they existed still load.
+    hour_start: str | None = None
+    hour_energy: float | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class UnitInfo:
+    """Identifying details of one unit, which do not change while it is set up.
+
+    Shared by the unit's entities, which read their names from it rather than
+    keeping their own copies. The strings are interned: brands and versions are
+    the same across most units of an account, and across accounts.
+    """
+
+    serial_number: str | None
+    brand: str | None
+    hw_version: str | None
+    soft_version: str | None
+    # Derived from the brand and serial number; an argument is ignored.
+    name: str = field(default="", compare=False)
+
+    def __post_init__(self) -> None:
+        """Intern the strings and derive the name."""
+        for info_field in fields(self)[:-1]:
+            value = getattr(self, info_field.name)
+            object.__setattr__(self, info_field.name, _intern(value))
+        object.__setattr__(
+            self, "name", sys.intern(f"{self.brand} {self.serial_number}")
+        )
+
+
+class EnergyReadCache:
+    """The energy values last read for one unit, valid for one local hour.
+
+    emerald_hws keeps a unit's energy as a JSON string, replaced only when an
+    hourly energy message arrives, and every getter parses it afresh. Most
+    messages are temperature or heating changes, so the values parsed from it
+    are kept until either the string is replaced or the hour in Home Assistant's
+    time zone rolls over -- the latter because "today's" total depends on the
+    date.
+    """
+
+    __slots__ = ("_raw", "_hour", "values", "hits", "misses")
+
+    def __init__(self) -> None:
+        """Initialize an empty cache."""
+        self._raw: object = None
+        self._hour: tuple[int, int, int, int] | None = None
+        self.values: tuple[float | None, str | None, float | None] | None = None
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, raw: object, hour: tuple[int, int, int, int]):
+        """Return the cached values for this data and hour, or None."""
+        if self.values is not None and hour == self._hour and raw == self._raw:
+            self.hits += 1
+            return self.values
+        self.misses += 1
+        return None
+
+    def store(self, raw: object, hour: tuple[int, int, int, int], values) -> None:
+        """Remember the values derived from this data in this hour."""
+        self._raw = raw
+        self._hour = hour
+        self.values = values
+
+
+def _read_energy(
+    instance: EmeraldHWS, hws_uuid: str
+) -> tuple[float | None, str | None, float | None]:
+    """Return a unit's energy today, and its last hourly reading and when."""
+    try:
+        # Parsed once for all three values, rather than once per getter
+        consumption = instance.getHistoricalConsumption(hws_uuid) or {}
+        # Home Assistant's today, which the daily energy sensors reset by, rather
+        # than the host's, which getDailyEnergyUsage would use
+        today = dt_util.now().strftime("%Y-%m-%d")
+        daily_energy = consumption.get("past_seven_days", {}).get(today)
+        # Interned: every snapshot in the hour carries the same timestamp.
+        hour_start = _intern(consumption.get("last_data_at") or None)
+        hour_energy = consumption.get("current_hour") if hour_start else None
+    except Exception as e:
+        _LOGGER.error(f"Error updating energy value for {hws_uuid}: {e}")
+        return None, None, None
+    return daily_energy, hour_start, hour_energy
+
+
+def read_snapshot(
+    instance: EmeraldHWS,
+    hws_uuid: str,
+    energy_cache: EnergyReadCache | None = None,
+) -> UnitSnapshot | None:
+    """Read the current state of one unit, or None if emerald_hws does not know it.
+
+    The getters only take the library's state lock, except on a cold start, when
+    they connect first -- so call this from the executor unless the instance is
+    known to be connected. Every getter for the unit runs in this one call so that
+    the entities sharing the result cost one read between them. With an
+    energy_cache, the energy values are only parsed when they can have changed.
+    """
+    status = instance.getFullStatus(hws_uuid)
+    if status is None:
+        return None
+    last_state = status.get("last_state") or {}
+
+    if energy_cache is None:
+        energy = _read_energy(instance, hws_uuid)
+    else:
+        raw = status.get("consumption_data")
+        now = dt_util.now()
+        hour = (now.year, now.month, now.day, now.hour)
+        if (energy := energy_cache.lookup(raw, hour)) is None:
+            energy = _read_energy(instance, hws_uuid)
+            energy_cache.store(raw, hour, energy)
+    daily_energy, hour_start, hour_energy = energy
+
+    return UnitSnapshot(
+        current_temperature=last_state.get("temp_current"),
+        target_temperature=last_state.get("temp_set"),
+        is_on=instance.isOn(hws_uuid),
+        mode=instance.currentMode(hws_uuid),
+        is_heating=instance.isHeating(hws_uuid),
+        daily_energy=daily_energy,
+        hour_start=hour_start,
+        hour_energy=hour_energy,
+    )
+
+
+def read_units(
+    instance: EmeraldHWS, hws_uuids: Iterable[str] | None = None
+) -> dict[str, tuple[UnitInfo, UnitSnapshot | None]]:
+    """Return the details and current state of units, every unit by default.
+
+    Blocking: listHWS connects on a cold start and waits for the property list.
+    Everything the entities need to be built is gathered here, in one executor
+    job for the whole account, so that no entity does I/O in its constructor.
+    """
+    if hws_uuids is None:
+        hws_uuids = instance.listHWS()
+    units = {}
+    for hws_uuid in hws_uuids:
+        info = instance.getInfo(hws_uuid) or {}
+        units[hws_uuid] = (
+            UnitInfo(
+                serial_number=info.get("serial_number"),
+                brand=info.get("brand"),
+                hw_version=info.get("hw_version"),
+                soft_version=info.get("soft_version"),
+            ),
+            read_snapshot(instance, hws_uuid),
+        )
+    return units
+
+
+def _property_unit_ids(properties) -> set[str]:
+    """Return the UUID of every unit in an emerald_hws property list."""
+    return {
+        heat_pump["id"]
+        for prop in properties
+        for heat_pump in prop.get("heat_pump", [])
+    }
+
+
+def discover_new_units(
+    instance: EmeraldHWS, config: Mapping[str, Any], known: set[str]
+) -> dict[str, tuple[UnitInfo, UnitSnapshot | None]]:
+    """Return the details and state of units added to the account since setup.
+
+    Blocking. The account's property list is fetched with a separate, unconnected
+    client borrowing the live instance's token, because refreshing the live
+    instance replaces its MQTT-maintained state with the REST copy, which lags
+    behind the devices. Only when a new unit turns up is the live instance
+    refreshed and subscribed to it, and every unit asked to report its status
+    again so that the lagging copy is short-lived.
+    """
+    probe = create_hws(config)
+    probe.token = instance.token
+    try:
+        probe.getAllHWS()
+    except Exception:
+        # Most likely an expired token; getAllHWS logs in afresh without one.
+        probe.token = ""
+        probe.getAllHWS()
+
+    new_uuids = _property_unit_ids(probe.properties) - known
+    if not new_uuids:
+        return {}
+
+    instance.getAllHWS()
+    for hws_uuid in new_uuids:
+        instance.subscribeForUpdates(hws_uuid)
+    try:
+        instance.requestAllStatusUpdates()
+    except Exception as e:
+        # Best-effort: the units report by themselves soon enough anyway.
+        _LOGGER.warning(f"Failed to request status after discovering units: {e}")
+    return read_units(instance, new_uuids)
+
+
+class EmeraldUnitCoordinator:
+    """Keep one snapshot of a unit's state and share it with that unit's entities.
+
+    The coordinator, not each entity, listens on the callback dispatcher. Updates
+    are pushed: by the time emerald_hws fires its callback the message is already
+    applied to the library's in-memory state, so the snapshot is read right there
+    on the MQTT thread and posted to the event loop, with no executor job and no
+    entity refresh in between. A snapshot identical to the last one read -- most
+    are, being heartbeats -- is dropped there, before it reaches the loop.
+
+    Units report a change as a burst of messages (mode, then temperature, then
+    the heating flag), so pushed snapshots are coalesced. A snapshot arriving
+    after a quiet spell is handed out at once and opens a window of
+    update_window seconds; anything arriving inside the window replaces the
+    pending snapshot and is handed out, once, when the window closes. No update
+    waits longer than one window, and a lone update is not delayed at all.
+
+    A coordinator can start from the state cache, before there is a connection to
+    the cloud, in which case it is marked restored until the unit's first live
+    snapshot arrives.
+
+    Commands for the unit go through its command queue. The snapshot handed out
+    is the live one with the queue's optimistic values overlaid; live_snapshot
+    is what the unit last reported.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        emerald_hws_instance: EmeraldHWS | None,
+        hws_uuid: str,
+        info: UnitInfo,
+        snapshot: UnitSnapshot | None,
+        callback_dispatcher,
+        executor: EmeraldExecutor,
+        update_window: float = 0,
+        cache: EmeraldStateCache | None = None,
+        restored: bool = False,
+    ) -> None:
+        """Initialize the coordinator and start listening for the unit's updates."""
+        self._hass = hass
+        self.emerald_hws = emerald_hws_instance
+        self.hws_uuid = hws_uuid
+        self.info = info
+        self._callback_dispatcher = callback_dispatcher
+        self.executor = executor
+        self.live_snapshot = snapshot
+        self.snapshot = snapshot
+        self.restored = restored
+        # Set by the entry's health monitor when the unit has gone quiet
+        self.stale = False
+        self._cache = cache
+        self._listeners: list[CALLBACK_TYPE] = []
+        # Held across read and post so that snapshots reach the event loop in the
+        # order they were read, whichever library thread fired the callback.
+        self._push_lock = threading.Lock()
+        self._update_window = update_window
+        self._window_handle: asyncio.TimerHandle | None = None
+        self._pending_snapshot: UnitSnapshot | None = None
+        # The last snapshot pushed from the module's thread, and how many reads
+        # since were identical to it and went no further
+        self._last_read: UnitSnapshot | None = None
+        self.unchanged_reads = 0
+        # Pushed snapshots that a later one in the same window replaced
+        self.coalesced_updates = 0
+        self.pushed_updates = 0
+        # Snapshots the unit's entities wrote to the state machine, and those
+        # they skipped as unchanged
+        self.state_writes = 0
+        self.skipped_writes = 0
+        self.commands = UnitCommandQueue(hass, self)
+        self.energy_cache = EnergyReadCache()
+        # Derived from each live snapshot once, for every entity to read
+        self.tank = TankMetrics()
+        if snapshot is not None:
+            self.tank.observe(snapshot, None if restored else time.monotonic())
+        callback_dispatcher.register_callback(self._handle_dispatch, hws_uuid)
+
+    @property
+    def available(self) -> bool:
+        """Return whether there is a snapshot to show and the unit is not stale."""
+        return self.snapshot is not None and not self.stale
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> Callable[[], None]:
+        """Call update_callback whenever a new snapshot is taken."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            if update_callback in self._listeners:
+                self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    async def async_refresh(self) -> None:
+        """Read a new snapshot in the executor and hand it to every listener."""
+        snapshot = await self.executor.async_add_job(
+            read_snapshot, self.emerald_hws, self.hws_uuid, self.energy_cache
+        )
+        if snapshot is None:
+            # Matches the entities' old behaviour: an unknown unit keeps the
+            # last values rather than blanking them.
+            _LOGGER.debug(f"No status for {self.hws_uuid}; keeping last snapshot")
+            return
+        self._async_set_snapshot(snapshot)
+
+    def _handle_dispatch(self) -> None:
+        """Push a new snapshot to the event loop (called from the module's thread).
+
+        Only reached while a message is being applied, which means the library is
+        connected, so the getters behind read_snapshot cannot fall into their
+        cold-start connect() here.
+        """
+        if self.emerald_hws is None:
+            # Connecting attaches the dispatcher before this coordinator has been
+            # handed the instance; async_reconcile brings it up to date.
+            return
+        with self._push_lock:
+            try:
+                snapshot = read_snapshot(
+                    self.emerald_hws, self.hws_uuid, self.energy_cache
+                )
+            except Exception:
+                _LOGGER.exception(f"Error reading state for {self.hws_uuid}")
+                return
+            if snapshot is None:
+                return
+            if snapshot == self._last_read and not (self.restored or self.stale):
+                # A heartbeat or a repeated key; there is nothing new to hand out.
+                self.unchanged_reads += 1
+                return
+            self._last_read = snapshot
+            self._hass.loop.call_soon_threadsafe(self._async_push_snapshot, snapshot)
+
+    @callback
+    def _async_push_snapshot(self, snapshot: UnitSnapshot) -> None:
+        """Count a snapshot pushed from the module's thread and hand it out."""
+        self.pushed_updates += 1
+        self._async_hand_out(snapshot)
+
+    @callback
+    def _async_hand_out(self, snapshot: UnitSnapshot) -> None:
+        """Hand out a snapshot now, or hold it until the window closes."""
+        if self._update_window <= 0:
+            self._async_set_snapshot(snapshot)
+            return
+        if self._window_handle is None:
+            self._async_set_snapshot(snapshot)
+            self._window_handle = self._hass.loop.call_later(
+                self._update_window, self._async_close_window
+            )
+            return
+        if self._pending_snapshot is not None:
+            self.coalesced_updates += 1
+        self._pending_snapshot = snapshot
+
+    @callback
+    def _async_close_window(self) -> None:
+        """Hand out the snapshot held during the window, if any."""
+        self._window_handle = None
+        if self._pending_snapshot is None:
+            return
+        snapshot, self._pending_snapshot = self._pending_snapshot, None
+        # Still mid-burst, most likely, so open a fresh window behind it. Not
+        # counted again: it was counted as pushed when it arrived.
+        self._async_hand_out(snapshot)
+
+    @callback
+    def async_reconcile(
+        self,
+        emerald_hws_instance: EmeraldHWS,
+        info: UnitInfo,
+        snapshot: UnitSnapshot | None,
+    ) -> None:
+        """Replace restored details and state with what the live instance reports."""
+        self.emerald_hws = emerald_hws_instance
+        self.info = info
+        if snapshot is not None:
+            self._async_set_snapshot(snapshot)
+
+    @callback
+    def async_set_unavailable(self) -> None:
+        """Drop the snapshot, making the unit's entities unavailable."""
+        self.live_snapshot = None
+        self.snapshot = None
+        # So that the unit's next report is pushed, even if nothing changed
+        self._last_read = None
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    @callback
+    def _async_set_snapshot(self, snapshot: UnitSnapshot) -> None:
+        """Store a live snapshot and hand it to every listener."""
+        self.live_snapshot = snapshot
+        self.restored = False
+        self.stale = False
+        self.tank.observe(snapshot, time.monotonic())
+        self.commands.async_observe(snapshot)
+        self.snapshot = self.commands.async_overlay(snapshot)
+        if self._cache is not None:
+            self._cache.async_schedule_save()
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    @callback
+    def async_set_update_window(self, update_window: float) -> None:
+        """Change the coalescing window, from the next window opened."""
+        self._update_window = update_window
+
+    @callback
+    def async_set_stale(self, stale: bool) -> None:
+        """Mark the unit as gone quiet, or heard from again."""
+        if stale == self.stale:
+            return
+        if stale:
+            _LOGGER.info(f"Emerald HWS unit {self.hws_uuid} has stopped reporting")
+        self.stale = stale
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    @callback
+    def async_update_optimistic(self) -> None:
+        """Hand out the live snapshot again with the queue's current overlay."""
+        self.snapshot = self.commands.async_overlay(self.live_snapshot)
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    @callback
+    def async_shutdown(self) -> None:
+        """Stop listening for updates and abandon queued commands."""
+        self.commands.async_shutdown()
+        self._callback_dispatcher.unregister_callback(
+            self._handle_dispatch, self.hws_uuid
+        )
+        if self._window_handle is not None:
+            self._window_handle.cancel()
+            self._window_handle = None
+        self._pending_snapshot = None
+        self._listeners.clear()
+
+
+@callback
+def async_add_unit_coordinators(
+    hass: HomeAssistant,
+    entry_data: dict,
+    units: Mapping[str, tuple[UnitInfo, UnitSnapshot | None]],
+    restored: bool = False,
+) -> list[EmeraldUnitCoordinator]:
+    """Create a coordinator for each unit not seen before, and return the new ones."""
+    coordinators = entry_data["coordinators"]
+    added = []
+    for hws_uuid, (info, snapshot) in units.items():
+        if hws_uuid in coordinators:
+            continue
+        coordinators[hws_uuid] = coordinator = EmeraldUnitCoordinator(
+            hass,
+            entry_data["instance"],
+            hws_uuid,
+            info,
+            snapshot,
+            entry_data["dispatcher"],
+            entry_data["executor"],
+            entry_data["update_window"],
+            entry_data["cache"],
+            restored,
+        )
+        added.append(coordinator)
+    return added
+
+
+@callback
+def async_reconcile_unit_coordinators(
+    hass: HomeAssistant,
+    entry_data: dict,
+    units: Mapping[str, tuple[UnitInfo, UnitSnapshot | None]],
+) -> list[EmeraldUnitCoordinator]:
+    """Bring the coordinators in line with a full discovery of the account.
+
+    Coordinators restored from the cache take on the live details and state, any
+    whose unit has left the account are dropped, leaving their entities
+    unavailable, and coordinators are created for units the cache did not know.
+    Returns the newly created ones.
+    """
+    coordinators = entry_data["coordinators"]
+    for hws_uuid in [uuid for uuid in coordinators if uuid not in units]:
+        _LOGGER.info(f"Emerald HWS unit {hws_uuid} is no longer on the account")
+        coordinator = coordinators.pop(hws_uuid)
+        coordinator.async_set_unavailable()
+        coordinator.async_shutdown()
+    for hws_uuid, (info, snapshot) in units.items():
+        if (coordinator := coordinators.get(hws_uuid)) is not None:
+            coordinator.async_reconcile(entry_data["instance"], info, snapshot)
+    return async_add_unit_coordinators(hass, entry_data, units)
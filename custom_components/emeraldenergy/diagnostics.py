@@ -0,0 +1,140 @@
+"""Diagnostics support for the Emerald Hot Water System integration."""
+
+from __future__ import annotations
+
+import time
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .recording import export_messages
+
+TO_REDACT = {CONF_USERNAME, CONF_PASSWORD, "serial_number"}
+
+
+def _rate(count: int, seconds: float) -> float | None:
+    """Return count per minute over seconds, or None before any time has passed."""
+    return round(count * 60 / seconds, 3) if seconds > 0 else None
+
+
+def _isoformat(when: datetime | None) -> str | None:
+    """Return a time in ISO 8601, or None if there is none."""
+    return when.isoformat() if when is not None else None
+
+
+def _unit_diagnostics(coordinator, unit_messages: int, uptime: float) -> dict:
+    """Return the state and counters of one unit's coordinator."""
+    commands = coordinator.commands
+    return {
+        "info": asdict(coordinator.info),
+        "snapshot": asdict(coordinator.snapshot) if coordinator.snapshot else None,
+        "restored": coordinator.restored,
+        "stale": coordinator.stale,
+        "messages": unit_messages,
+        "messages_per_minute": _rate(unit_messages, uptime),
+        "unchanged_reads": coordinator.unchanged_reads,
+        "pushed_updates": coordinator.pushed_updates,
+        "coalesced_updates": coordinator.coalesced_updates,
+        "state_writes": coordinator.state_writes,
+        "skipped_writes": coordinator.skipped_writes,
+        "tank": {
+            "capacity": coordinator.tank.capacity,
+            "time_to_target": coordinator.tank.time_to_target,
+            "heat_up_rate": coordinator.tank.heat_up_rate,
+        },
+        "energy_cache": {
+            "hits": coordinator.energy_cache.hits,
+            "misses": coordinator.energy_cache.misses,
+        },
+        "commands": {
+            "sent": commands.sent_commands,
+            "superseded": commands.superseded_commands,
+            "skipped": commands.skipped_commands,
+            "failed": commands.failed_commands,
+            "publish_timeouts": commands.publish_timeouts,
+            "echo_timeouts": commands.echo_timeouts,
+            "ack_latency": commands.ack_latency.as_dict(),
+            "echo_latency": commands.echo_latency.as_dict(),
+        },
+    }
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    diagnostics: dict[str, Any] = {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+    }
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if not entry_data:
+        return diagnostics
+
+    dispatcher = entry_data["dispatcher"]
+    executor = entry_data["executor"]
+    health = entry_data["health"]
+    uptime = time.monotonic() - dispatcher.started
+    recording = None
+    if (recorder := entry_data["recorder"]) is not None:
+        # Raw status messages, oldest first; bench.fake_hws.load_recording
+        # replays these. Decoding them takes a while, so it runs in the executor.
+        recording = {
+            "size": recorder.size,
+            "messages": await hass.async_add_executor_job(
+                export_messages, recorder.snapshot()
+            ),
+        }
+    diagnostics.update(
+        {
+            "connected": entry_data["instance"] is not None,
+            # Config entries sharing the account's connection, this one included
+            "connection_users": entry_data["connection"].users,
+            "setup_timings": dict(entry_data["setup_timings"]),
+            "dispatcher": {
+                "uptime": uptime,
+                "messages": dispatcher.messages,
+                "messages_per_minute": _rate(dispatcher.messages, uptime),
+                "connections": dispatcher.connections,
+                "fanout": dispatcher.fanout.as_dict(),
+                "dispatch_duration": dispatcher.dispatch_durations.as_dict(),
+            },
+            "health": {
+                "last_message": _isoformat(health.last_message),
+                "messages_per_minute": health.messages_per_minute,
+                "reconnects": health.reconnects,
+                "last_command": _isoformat(health.last_command),
+            },
+            "executor": {
+                "queue_depth": executor.queue_depth,
+                "max_queue_depth": executor.max_queue_depth,
+                "running": executor.running,
+                "completed_jobs": executor.completed_jobs,
+                "rejected_jobs": executor.rejected_jobs,
+                "wait_time": executor.wait_times.as_dict(),
+                "job_duration": {
+                    name: durations.as_dict()
+                    for name, durations in executor.job_durations.items()
+                },
+            },
+            "units": async_redact_data(
+                {
+                    hws_uuid: _unit_diagnostics(
+                        coordinator,
+                        dispatcher.unit_messages.get(hws_uuid, 0),
+                        uptime,
+                    )
+                    for hws_uuid, coordinator in entry_data["coordinators"].items()
+                },
+                TO_REDACT,
+            ),
+            # None unless the entry is recording status messages
+            "recording": recording,
+        }
+    )
+    return diagnostics
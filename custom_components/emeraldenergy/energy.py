@@ -0,0 +1,259 @@
+"""Hourly energy statistics for the Emerald Hot Water System integration."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import (
+    StatisticData,
+    StatisticMeanType,
+    StatisticMetaData,
+)
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    get_last_statistics,
+    statistics_during_period,
+)
+from homeassistant.const import UnitOfEnergy
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .coordinator import EmeraldUnitCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+HOUR = timedelta(hours=1)
+# Daily totals are reported to three decimal places; anything smaller than this
+# between a day's total and what was imported for it is rounding, not a gap.
+_GAP_TOLERANCE = 0.0005
+
+
+def energy_statistic_id(hws_uuid: str) -> str:
+    """Return the external statistic ID holding a unit's hourly energy."""
+    return f"{DOMAIN}:energy_{hws_uuid.replace('-', '_').lower()}"
+
+
+def parse_hour(timestamp: str | None) -> datetime | None:
+    """Return the start of the hour of an emerald_hws local timestamp."""
+    parsed = dt_util.parse_datetime(timestamp) if timestamp else None
+    if parsed is None:
+        return None
+    if parsed.tzinfo is None:
+        # emerald_hws keeps the unit's wall-clock time, assumed to be HA's.
+        parsed = parsed.replace(tzinfo=dt_util.get_default_time_zone())
+    return parsed.replace(minute=0, second=0, microsecond=0)
+
+
+def _day_start(day: str) -> datetime | None:
+    """Return local midnight at the start of an emerald_hws YYYY-MM-DD day."""
+    parsed = dt_util.parse_date(day)
+    return dt_util.start_of_local_day(parsed) if parsed else None
+
+
+@callback
+def async_claim_import(
+    importers: dict[str, list[EnergyStatisticsImporter]],
+    importer: EnergyStatisticsImporter,
+) -> None:
+    """Queue an importer for its unit, starting it unless another is running.
+
+    importers is the shared connection's, so that config entries for the same
+    account never both write a unit's statistic and its running sum.
+    """
+    queue = importers.setdefault(importer.statistic_id, [])
+    queue.append(importer)
+    if len(queue) == 1:
+        importer.async_start()
+
+
+@callback
+def async_release_import(
+    importers: dict[str, list[EnergyStatisticsImporter]],
+    importer: EnergyStatisticsImporter,
+) -> None:
+    """Drop a queued importer, handing its unit to the next one if it was running.
+
+    The next importer picks the running sum up from the recorder, as at startup.
+    """
+    queue = importers.get(importer.statistic_id)
+    if not queue or importer not in queue:
+        return
+    running = queue[0] is importer
+    queue.remove(importer)
+    if running:
+        importer.async_stop()
+        if queue:
+            queue[0].async_start()
+    if not queue:
+        del importers[importer.statistic_id]
+
+
+class EnergyStatisticsImporter:
+    """Write one unit's hourly energy to the recorder as an external statistic.
+
+    Units report the energy of each hour once, as the hour closes, so every hour
+    becomes exactly one statistics row with a running sum -- rather than the
+    recorder sampling a daily total that only moves once an hour.
+
+    When the unit first reports live state, the hours missed while Home
+    Assistant was down are filled in. emerald_hws only keeps daily totals for
+    the past seven days, not the hours behind them, so each day's shortfall
+    against what was imported goes in as a single row at the first missing hour.
+    Days are never rewritten before the last imported row, which would break
+    the running sum of every row after it.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinator: EmeraldUnitCoordinator):
+        """Initialize the importer for the coordinator's unit."""
+        self._hass = hass
+        self._coordinator = coordinator
+        self.statistic_id = energy_statistic_id(coordinator.hws_uuid)
+        info = coordinator.info
+        self._metadata = StatisticMetaData(
+            has_sum=True,
+            mean_type=StatisticMeanType.NONE,
+            name=f"{info.name} Energy",
+            source=DOMAIN,
+            statistic_id=self.statistic_id,
+            unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        )
+        self._last_start: datetime | None = None
+        self._last_sum = 0.0
+        # The hour_start of the last snapshot handled, to skip repeats cheaply
+        self._seen_hour: str | None = None
+        self._backfilled = False
+        self._backfill_task: asyncio.Task | None = None
+        self._remove_listener = None
+
+    @callback
+    def async_start(self) -> None:
+        """Start importing the unit's hours as its snapshots arrive."""
+        self._remove_listener = self._coordinator.async_add_listener(
+            self._async_handle_snapshot
+        )
+        self._async_handle_snapshot()
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop importing."""
+        if self._remove_listener is not None:
+            self._remove_listener()
+            self._remove_listener = None
+        if self._backfill_task is not None:
+            self._backfill_task.cancel()
+            self._backfill_task = None
+
+    @callback
+    def _async_handle_snapshot(self) -> None:
+        """Import the hour a new live snapshot reports, once backfilled."""
+        coordinator = self._coordinator
+        snapshot = coordinator.live_snapshot
+        if coordinator.emerald_hws is None or coordinator.restored or not snapshot:
+            return
+        if not self._backfilled:
+            if self._backfill_task is None:
+                self._backfill_task = self._hass.async_create_background_task(
+                    self._async_backfill(),
+                    f"{DOMAIN} energy backfill {coordinator.hws_uuid}",
+                )
+            return
+        if snapshot.hour_start == self._seen_hour:
+            return
+        self._seen_hour = snapshot.hour_start
+        start = parse_hour(snapshot.hour_start)
+        if start is None or snapshot.hour_energy is None:
+            return
+        self._async_add([(start, snapshot.hour_energy)])
+
+    async def _async_backfill(self) -> None:
+        """Load the last imported row and fill in the hours missed since."""
+        try:
+            await self._async_load_last()
+            consumption = await self._coordinator.executor.async_add_job(
+                self._coordinator.emerald_hws.getHistoricalConsumption,
+                self._coordinator.hws_uuid,
+            )
+            consumption = consumption or {}
+            self._async_add(await self._async_gap_rows(consumption))
+        except Exception as err:
+            # Tried again with the unit's next snapshot.
+            _LOGGER.warning(
+                f"Failed to backfill energy statistics for "
+                f"{self._coordinator.hws_uuid}: {err}"
+            )
+            return
+        finally:
+            self._backfill_task = None
+        self._seen_hour = consumption.get("last_data_at")
+        self._backfilled = True
+
+    async def _async_load_last(self) -> None:
+        """Pick up the running sum from the last row in the recorder."""
+        last = await get_instance(self._hass).async_add_executor_job(
+            get_last_statistics, self._hass, 1, self.statistic_id, True, {"sum"}
+        )
+        if rows := last.get(self.statistic_id):
+            self._last_start = dt_util.utc_from_timestamp(rows[0]["start"])
+            self._last_sum = rows[0]["sum"] or 0.0
+
+    async def _async_gap_rows(self, consumption: dict) -> list[tuple[datetime, float]]:
+        """Return a row for each day's energy the recorder is missing."""
+        days = consumption.get("past_seven_days") or {}
+        last_data = parse_hour(consumption.get("last_data_at"))
+        starts = {day: start for day in days if (start := _day_start(day))}
+        if not starts or last_data is None:
+            return []
+        imported = await self._async_imported_by_day(min(starts.values()))
+
+        rows = []
+        cursor = self._last_start + HOUR if self._last_start else None
+        for day, day_start in sorted(starts.items(), key=lambda item: item[1]):
+            gap = days[day] - imported.get(day_start.date(), 0.0)
+            if gap <= _GAP_TOLERANCE:
+                continue
+            hour = day_start if cursor is None else max(day_start, cursor)
+            # Nothing after the last hour reported, which arrives live instead
+            if hour >= min(day_start + timedelta(days=1), last_data + HOUR):
+                continue
+            rows.append((hour, gap))
+            cursor = hour + HOUR
+        return rows
+
+    async def _async_imported_by_day(self, start: datetime) -> dict[date, float]:
+        """Return the energy already imported for each local day since start."""
+        stats = await get_instance(self._hass).async_add_executor_job(
+            statistics_during_period,
+            self._hass,
+            start,
+            None,
+            {self.statistic_id},
+            "hour",
+            None,
+            {"change"},
+        )
+        imported: dict[date, float] = defaultdict(float)
+        for row in stats.get(self.statistic_id, []):
+            day = dt_util.as_local(dt_util.utc_from_timestamp(row["start"])).date()
+            imported[day] += row.get("change") or 0.0
+        return imported
+
+    @callback
+    def _async_add(self, rows: list[tuple[datetime, float]]) -> None:
+        """Append hourly rows after the last one imported, extending the sum."""
+        statistics = []
+        for start, energy in rows:
+            if self._last_start is not None and start <= self._last_start:
+                # Already imported; each hour is written once.
+                continue
+            self._last_sum += energy
+            self._last_start = start
+            statistics.append(
+                StatisticData(start=start, state=energy, sum=self._last_sum)
+            )
+        if statistics:
+            async_add_external_statistics(self._hass, self._metadata, statistics)
@@ -0,0 +1,94 @@
+"""Base entity for the Emerald Hot Water System integration."""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections.abc import Hashable
+
+from homeassistant.core import callback
+from homeassistant.helpers.entity import Entity
+
+from .coordinator import EmeraldUnitCoordinator
+
+
+class EmeraldUnitEntity(Entity, ABC):
+    """An entity rendering the snapshots of one unit's coordinator.
+
+    Most traffic from a unit is heartbeats and health-check replies that change
+    nothing an entity shows, so each entity remembers a fingerprint of what it
+    last wrote -- state, attributes and availability -- and only writes when a
+    new snapshot changes it.
+
+    While the coordinator is still showing state restored from the cache, the
+    entity says so with a restored attribute.
+
+    Subclasses provide _state_fingerprint; one that does not cannot be created.
+    """
+
+    _attr_should_poll = False
+
+    def __init__(self, coordinator: EmeraldUnitCoordinator) -> None:
+        """Initialize the entity for the coordinator's unit."""
+        self._coordinator = coordinator
+        self._hws_uuid = coordinator.hws_uuid
+        self._last_fingerprint: Hashable = None
+        self._remove_listener = None
+
+    @property
+    def available(self) -> bool:
+        """Return whether the unit has state to show and is still reporting."""
+        return self._coordinator.available
+
+    @abstractmethod
+    def _state_fingerprint(self) -> Hashable:
+        """Return a compact, comparable summary of everything the entity shows."""
+
+    def _full_fingerprint(self) -> Hashable:
+        """Return the fingerprint with what every entity shows added."""
+        return (self.available, self._coordinator.restored, self._state_fingerprint())
+
+    @property
+    def extra_state_attributes(self):
+        """Return additional state attributes."""
+        attrs = super().extra_state_attributes
+        if not self._coordinator.restored:
+            return attrs
+        return {**(attrs or {}), "restored": True}
+
+    @callback
+    def _process_snapshot(self) -> None:
+        """Update any values derived from the coordinator's snapshot."""
+
+    async def async_added_to_hass(self) -> None:
+        """Start rendering the unit's snapshots once added to Home Assistant."""
+        await super().async_added_to_hass()
+        # Home Assistant writes the state once as the entity is added
+        self._last_fingerprint = self._full_fingerprint()
+        self._remove_listener = self._coordinator.async_add_listener(
+            self._handle_coordinator_update
+        )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state from the coordinator's new snapshot, if it changed."""
+        self._process_snapshot()
+        self._async_write_if_changed()
+
+    @callback
+    def _async_write_if_changed(self) -> None:
+        """Write the state if anything shown differs from the last write."""
+        fingerprint = self._full_fingerprint()
+        if fingerprint == self._last_fingerprint:
+            self._coordinator.skipped_writes += 1
+            return
+        self._last_fingerprint = fingerprint
+        self._coordinator.state_writes += 1
+        self.async_write_ha_state()
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Clean up when entity is removed from Home Assistant."""
+        # Stop listening to the unit's coordinator
+        if self._remove_listener is not None:
+            self._remove_listener()
+            self._remove_listener = None
+        await super().async_will_remove_from_hass()
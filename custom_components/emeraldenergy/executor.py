@@ -0,0 +1,119 @@
+"""Dedicated thread pool for the Emerald Hot Water System integration."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import DOMAIN, MAX_BULK_COMMANDS
+from .stats import Histogram
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+# Threads per config entry. Enough for a connect or discovery alongside the
+# set_mode service commanding as many units at once as it may. Threads are only
+# started when no idle one is free, so most of the time one or two run.
+MAX_WORKERS = 2 + MAX_BULK_COMMANDS
+# Jobs allowed to wait for a thread before new ones are rejected
+MAX_QUEUED = 10
+
+
+class ExecutorFull(HomeAssistantError):
+    """Error to indicate the entry's thread pool has too much work waiting."""
+
+
+class EmeraldExecutor:
+    """Run a config entry's blocking emerald_hws calls on a small pool of its own.
+
+    Every call into the library can block on the cloud -- a control publish for
+    up to 20 seconds when the connection has silently dropped -- so none of them
+    use Home Assistant's shared executor, where a cloud outage could tie up
+    threads other integrations need. Once MAX_QUEUED jobs are waiting, further
+    jobs are rejected with ExecutorFull instead of piling up behind the stuck
+    ones.
+
+    The queue depth and running count are kept for diagnostics, along with how
+    long jobs waited for a thread and, by function, how long they ran.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        max_workers: int = MAX_WORKERS,
+        max_queued: int = MAX_QUEUED,
+    ) -> None:
+        """Initialize the pool; its threads are started as jobs arrive."""
+        self._hass = hass
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix=DOMAIN)
+        self._max_queued = max_queued
+        # Guards the counters, which the pool's threads update too
+        self._lock = threading.Lock()
+        self.queue_depth = 0
+        self.running = 0
+        self.max_queue_depth = 0
+        self.completed_jobs = 0
+        self.rejected_jobs = 0
+        self.wait_times = Histogram()
+        self.job_durations: dict[str, Histogram] = {}
+
+    @callback
+    def async_add_job(self, func: Callable[..., _T], *args: Any) -> asyncio.Future[_T]:
+        """Run func(*args) on the pool, or raise ExecutorFull if too much is waiting."""
+        with self._lock:
+            if self.queue_depth >= self._max_queued:
+                self.rejected_jobs += 1
+                raise ExecutorFull(
+                    "Too many requests to the Emerald cloud are waiting; "
+                    "the command was not applied."
+                )
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        submitted = time.monotonic()
+        started = False
+        name = getattr(func, "__name__", repr(func))
+
+        def run() -> _T:
+            nonlocal started
+            start = time.monotonic()
+            with self._lock:
+                started = True
+                self.queue_depth -= 1
+                self.running += 1
+                self.wait_times.add(start - submitted)
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed_jobs += 1
+                    if (durations := self.job_durations.get(name)) is None:
+                        durations = self.job_durations[name] = Histogram()
+                    durations.add(time.monotonic() - start)
+
+        def release_if_dropped(_future: asyncio.Future) -> None:
+            # A job cancelled while still waiting never reaches run()
+            with self._lock:
+                if not started:
+                    self.queue_depth -= 1
+
+        future = self._hass.loop.run_in_executor(self._pool, run)
+        future.add_done_callback(release_if_dropped)
+        return future
+
+    @callback
+    def async_shutdown(self) -> None:
+        """Drop waiting jobs and let the pool's threads exit once idle.
+
+        Jobs already running cannot be interrupted and finish in the background.
+        """
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,136 @@
+"""Connection health monitoring for the Emerald Hot Water System integration."""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from collections.abc import Callable
+from datetime import datetime, timedelta
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util
+
+from .const import HEALTH_UPDATE_INTERVAL
+
+
+def _wall_time(monotonic: float | None, now: float) -> datetime | None:
+    """Return the UTC time a time.monotonic() value, now being now, stands for."""
+    if monotonic is None:
+        return None
+    return dt_util.utcnow() - timedelta(seconds=now - monotonic)
+
+
+class EntryHealthMonitor:
+    """Work out the health of a config entry's cloud connection on one timer.
+
+    Every HEALTH_UPDATE_INTERVAL the monitor reads the dispatcher's message
+    counters and the units' command queues, and works out the figures the
+    connection health sensors show. The cost is the same however many units
+    the entry has: one timer, and one pass over the coordinators.
+
+    The same pass decides each unit's availability. Once connected, a unit that
+    has sent nothing for health_window seconds is marked stale, which makes its
+    entities unavailable until it reports again. A health_window of 0 turns
+    this off, as it turns off emerald_hws' own health check.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, entry_data: dict, health_window: float
+    ) -> None:
+        """Initialize the monitor for an entry's dispatcher and coordinators."""
+        self._hass = hass
+        self._entry_data = entry_data
+        self._health_window = health_window
+        self._listeners: list[CALLBACK_TYPE] = []
+        # Message count samples, one per tick, spanning the last minute
+        self._samples: deque[tuple[float, int]] = deque(
+            maxlen=int(60 / HEALTH_UPDATE_INTERVAL.total_seconds()) + 1
+        )
+        # When the last message arrived and the last command was accepted. Only
+        # worked out again when the dispatcher or a command queue reports a new
+        # event, so that they change when something happens rather than on
+        # every tick.
+        self.last_message: datetime | None = None
+        self.messages_per_minute: float | None = None
+        self.reconnects = 0
+        self.last_command: datetime | None = None
+        # The time.monotonic() values the two times above were worked out from
+        self._last_message_seen: float | None = None
+        self._last_command_seen: float | None = None
+
+    @callback
+    def async_start(self) -> CALLBACK_TYPE:
+        """Start the timer, returning a function that stops it."""
+        self._async_update()
+        return async_track_time_interval(
+            self._hass, self._async_tick, HEALTH_UPDATE_INTERVAL
+        )
+
+    @callback
+    def async_set_health_window(self, health_window: float) -> None:
+        """Change how long a unit may go unheard, and apply it straight away."""
+        self._health_window = health_window
+        self._async_tick(None)
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> Callable[[], None]:
+        """Call update_callback after every tick."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            if update_callback in self._listeners:
+                self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def _async_tick(self, _now) -> None:
+        """Refresh the figures and hand them to every listener."""
+        self._async_update()
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    @callback
+    def _async_update(self) -> None:
+        """Work out the connection figures and every unit's availability."""
+        now = time.monotonic()
+        dispatcher = self._entry_data["dispatcher"]
+        coordinators = self._entry_data["coordinators"]
+
+        self._samples.append((now, dispatcher.messages))
+        since, count = self._samples[0]
+        self.messages_per_minute = (
+            round((dispatcher.messages - count) * 60 / (now - since), 1)
+            if now > since
+            else None
+        )
+        if dispatcher.last_message != self._last_message_seen:
+            self._last_message_seen = dispatcher.last_message
+            self.last_message = _wall_time(dispatcher.last_message, now)
+        self.reconnects = max(dispatcher.connections - 1, 0)
+        last_success = max(
+            (
+                coordinator.commands.last_success
+                for coordinator in coordinators.values()
+                if coordinator.commands.last_success is not None
+            ),
+            default=None,
+        )
+        if last_success != self._last_command_seen:
+            self._last_command_seen = last_success
+            self.last_command = _wall_time(last_success, now)
+
+        if dispatcher.last_connected is None:
+            # Until connected, units show their restored state instead.
+            return
+        for hws_uuid, coordinator in coordinators.items():
+            # A unit only has to be heard from within a window of connecting.
+            heard = max(
+                dispatcher.unit_last_message.get(hws_uuid, 0.0),
+                dispatcher.last_connected,
+            )
+            coordinator.async_set_stale(
+                bool(self._health_window) and now - heard > self._health_window
+            )
@@ -2,12 +2,13 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import logging
 import re
-from collections.abc import Iterator, Mapping
+from collections.abc import Callable, Iterator, Mapping
 from pathlib import PurePath
-from typing import Any
-
-from emerald_hws.emeraldhws import EmeraldHWS
+from typing import TYPE_CHECKING, Any
 
 from .const import (
     CONF_CONNECTION_TIMEOUT,
@@ -16,8 +17,12 @@ from .const import (
     CONF_USERNAME,
     DEFAULT_CONNECTION_TIMEOUT,
     DEFAULT_HEALTH_CHECK,
+    LOG_SAMPLE_EVERY,
 )
 
+if TYPE_CHECKING:
+    from emerald_hws.emeraldhws import EmeraldHWS
+
 
 # A compiled function rejecting its caller's argument count, e.g. "function takes
 # exactly 43 arguments (45 given)". Both wordings below come from CPython's C API
@@ -105,7 +110,7 @@ def is_awscrt_straddle_error(err: BaseException) -> bool:
 
     Neither is retryable. The stale modules stay in sys.modules for the lifetime
     of the process, so only restarting Home Assistant can clear it -- which is why
-    this is reported as a permanent error rather than left to HA's retry backoff.
+    this is raised as a repair issue rather than retried like other failures.
     """
     for link in _exception_chain(err):
         message = str(link)
@@ -120,13 +125,29 @@ def is_awscrt_straddle_error(err: BaseException) -> bool:
     return False
 
 
+def _emerald_hws_class() -> type[EmeraldHWS]:
+    """Import emerald_hws and return its client class.
+
+    Blocking: emerald_hws imports awsiotsdk and the compiled awscrt extension.
+    Nothing in the integration imports it at module level, so that loading the
+    integration or opening the config flow does no such import on the event
+    loop, and Home Assistant's startup never waits for it. The first executor
+    job that builds a client imports it instead. See is_awscrt_straddle_error
+    for what else that chain of imports can go through.
+    """
+    from emerald_hws.emeraldhws import EmeraldHWS
+
+    return EmeraldHWS
+
+
 def create_hws(config: Mapping[str, Any]) -> EmeraldHWS:
     """Build an EmeraldHWS client from config entry data or config flow input.
 
-    Blocking: constructing EmeraldHWS reaches into awsiotsdk/awscrt, which imports a
-    compiled extension and does blocking work, so only call this from the executor.
+    Blocking: importing emerald_hws, the first time, and constructing EmeraldHWS
+    reach into awsiotsdk/awscrt, which imports a compiled extension and does
+    blocking work, so only call this from the executor.
     """
-    return EmeraldHWS(
+    return _emerald_hws_class()(
         config.get(CONF_USERNAME),
         config.get(CONF_PASSWORD),
         connection_timeout_minutes=config.get(
@@ -134,3 +155,160 @@ def create_hws(config: Mapping[str, Any]) -> EmeraldHWS:
         ),
         health_check_minutes=config.get(CONF_HEALTH_CHECK, DEFAULT_HEALTH_CHECK),
     )
+
+
+def entry_config(entry: Any) -> dict[str, Any]:
+    """Return a config entry's data with the options it has been retuned with."""
+    return {**entry.data, **entry.options}
+
+
+def _timer_seconds(minutes: float) -> float:
+    """Return an emerald_hws timer period, with the library's 5-minute minimum."""
+    if minutes <= 0:
+        return 0
+    return max(minutes, 5) * 60.0
+
+
+def retune_hws(instance: EmeraldHWS, config: Mapping[str, Any]) -> bool:
+    """Apply new connection settings to a connected client, leaving MQTT alone.
+
+    emerald_hws reads its public reconnect and health check periods, in seconds,
+    each time one of its timers reschedules, so they are set the way its
+    constructor sets them and its timers are left alone: each runs out its
+    current period, then runs on the new one, or stops if it was turned off.
+
+    A check the client was built with turned off has no timer to pick the new
+    period up, so it stays off until the next connect; False is returned then.
+    """
+    connection_timeout = _timer_seconds(
+        config.get(CONF_CONNECTION_TIMEOUT, DEFAULT_CONNECTION_TIMEOUT)
+    )
+    health_check_interval = _timer_seconds(
+        config.get(CONF_HEALTH_CHECK, DEFAULT_HEALTH_CHECK)
+    )
+    started = (instance.connection_timeout > 0 or connection_timeout == 0) and (
+        instance.health_check_interval > 0 or health_check_interval == 0
+    )
+    instance.connection_timeout = connection_timeout
+    instance.health_check_interval = health_check_interval
+    return started
+
+
+def account_key(config: Mapping[str, Any]) -> str:
+    """Return the key an account's connection is shared under: its username."""
+    return str(config.get(CONF_USERNAME) or "").strip().lower()
+
+
+def _password_digest(config: Mapping[str, Any]) -> bytes:
+    """Return a digest of the password in config, to compare without keeping it."""
+    return hashlib.sha256(str(config.get(CONF_PASSWORD) or "").encode()).digest()
+
+
+class SharedConnection:
+    """One account's EmeraldHWS client and callback dispatcher, and their users.
+
+    instance stays None until a user has connected. lock is held while
+    connecting, so that users waiting behind the first pick up its client
+    rather than opening their own.
+
+    energy_importers queues the energy statistics importers of each unit by
+    statistic ID; only the first of each runs. See energy.async_claim_import.
+    """
+
+    __slots__ = (
+        "key",
+        "password_digest",
+        "dispatcher",
+        "instance",
+        "users",
+        "lock",
+        "energy_importers",
+    )
+
+    def __init__(self, key: str, password_digest: bytes, dispatcher: Any) -> None:
+        """Initialize an unconnected, unused connection."""
+        self.key = key
+        # Of the password of the entry that created the connection, to spot
+        # entries for the account with another one
+        self.password_digest = password_digest
+        self.dispatcher = dispatcher
+        self.instance: EmeraldHWS | None = None
+        self.users = 0
+        self.lock = asyncio.Lock()
+        self.energy_importers: dict[str, list[Any]] = {}
+
+    def uses_password(self, config: Mapping[str, Any]) -> bool:
+        """Return whether config has the password of the entry that created it."""
+        return self.password_digest == _password_digest(config)
+
+
+class ConnectionPool:
+    """The EmeraldHWS clients of the process, one per account.
+
+    Config entries for the same account -- one per site, or one left behind by a
+    re-add -- share a single client, and with it a single MQTT connection and
+    its threads and timers, rather than each logging in and subscribing to the
+    same units. The client is built with the connection settings of whichever
+    entry connects first, and so logs in with that entry's password alone;
+    see SharedConnection.uses_password.
+
+    Every acquire() is matched by a release(); the last release hands the
+    client back for disconnecting. Only used from the event loop.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty pool."""
+        self._connections: dict[str, SharedConnection] = {}
+
+    def acquire(
+        self, config: Mapping[str, Any], create_dispatcher: Callable[[], Any]
+    ) -> SharedConnection:
+        """Return the account's shared connection, creating it if unused."""
+        key = account_key(config)
+        shared = self._connections.get(key)
+        if shared is None:
+            shared = SharedConnection(
+                key, _password_digest(config), create_dispatcher()
+            )
+            self._connections[key] = shared
+        shared.users += 1
+        return shared
+
+    def release(self, shared: SharedConnection) -> EmeraldHWS | None:
+        """Drop one user, returning the client to disconnect if it was the last."""
+        shared.users -= 1
+        if shared.users > 0:
+            return None
+        if self._connections.get(shared.key) is shared:
+            del self._connections[shared.key]
+        instance, shared.instance = shared.instance, None
+        return instance
+
+
+CONNECTION_POOL = ConnectionPool()
+
+
+class SampledDebugLog:
+    """Log a DEBUG line for one in every LOG_SAMPLE_EVERY calls.
+
+    For lines logged on every message, which would otherwise cost a log record
+    each even at INFO. Arguments are formatted only for the lines logged, and
+    nothing is done at all unless the logger is enabled for DEBUG.
+    """
+
+    __slots__ = ("_logger", "_calls")
+
+    def __init__(self, logger: logging.Logger) -> None:
+        """Initialize for logger."""
+        self._logger = logger
+        self._calls = 0
+
+    def __call__(self, msg: str, *args: Any) -> None:
+        """Count a call, logging msg % args for the first of every sample."""
+        if not self._logger.isEnabledFor(logging.DEBUG):
+            return
+        self._calls += 1
+        if self._calls % LOG_SAMPLE_EVERY == 1:
+            self._logger.debug(
+                f"{msg} (1 in {LOG_SAMPLE_EVERY} logged, {self._calls} so far)", *args
+            )
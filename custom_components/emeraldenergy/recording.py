@@ -0,0 +1,89 @@
+"""Recording of raw status traffic for the Emerald Hot Water System integration."""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+
+class StatusRecorder:
+    """Keep the most recent status messages of a connection, for replaying later.
+
+    Turned on with the record_messages option. Each message is kept as a tuple
+    of the time it arrived, its topic and its raw payload, in a deque of fixed
+    length, so memory is bounded by the number of messages however long Home
+    Assistant runs. Recording a message is one append on the MQTT thread; the
+    payload is only decoded when the recording is exported.
+
+    Exported, it is what bench.fake_hws.load_recording reads: a record per message
+    of its time since the first message kept, its topic and its payload.
+    """
+
+    __slots__ = ("_messages",)
+
+    def __init__(self, size: int, previous: StatusRecorder | None = None) -> None:
+        """Initialize a recorder of the last size messages.
+
+        The messages of a previous recorder are carried over, as many as fit.
+        """
+        self._messages: deque[tuple[float, str, bytes]] = deque(
+            previous._messages if previous else (), maxlen=size
+        )
+
+    def __len__(self) -> int:
+        """Return the number of messages kept."""
+        return len(self._messages)
+
+    @property
+    def size(self) -> int:
+        """Return the number of messages the recorder keeps at most."""
+        return self._messages.maxlen
+
+    def record(self, topic: str, payload: bytes) -> None:
+        """Keep a message (called from the MQTT thread)."""
+        # A topic per unit, so interning keeps one copy of each.
+        self._messages.append((time.monotonic(), sys.intern(topic), payload))
+
+    def snapshot(self) -> list[tuple[float, str, bytes]]:
+        """Return the messages kept, oldest first, as recorded.
+
+        Cheap enough for the event loop; decoding them with export_messages is
+        not, so that runs in the executor.
+        """
+        # A copy; the MQTT thread may append while it is used.
+        return list(self._messages)
+
+
+def export_messages(messages: list[tuple[float, str, bytes]]) -> list[dict]:
+    """Return a recorder's snapshot in the replay format (blocking)."""
+    if not messages:
+        return []
+    start = messages[0][0]
+    return [
+        {
+            "t": round(received - start, 3),
+            "topic": topic,
+            "payload": _decode(payload),
+        }
+        for received, topic, payload in messages
+    ]
+
+
+def _decode(payload: bytes):
+    """Return a payload as JSON, or as text if it is not JSON."""
+    try:
+        return json.loads(payload)
+    except ValueError:
+        if isinstance(payload, (bytes, bytearray)):
+            return payload.decode("utf-8", "replace")
+        return str(payload)
+
+
+def write_recording(path: Path, messages: list[tuple[float, str, bytes]]) -> None:
+    """Write a recorder's snapshot to path as JSON lines (blocking)."""
+    with path.open("w", encoding="utf-8") as file:
+        for record in export_messages(messages):
+            file.write(json.dumps(record, separators=(",", ":")) + "\n")
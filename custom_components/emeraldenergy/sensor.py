@@ -3,24 +3,148 @@
 from __future__ import annotations
 
 import logging
-from datetime import datetime, date
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
 
 from homeassistant import config_entries
 from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorEntity,
+    SensorEntityDescription,
     SensorStateClass,
 )
-from homeassistant.const import UnitOfEnergy
-from homeassistant.core import HomeAssistant
-from emerald_hws.emeraldhws import EmeraldHWS
+from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfEnergy,
+    UnitOfTime,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceEntryType
+from homeassistant.helpers.dispatcher import (
+    async_dispatcher_connect,
+    async_dispatcher_send,
+)
+from homeassistant.helpers.event import async_track_time_change
+from homeassistant.util import dt as dt_util
 
 from .const import (
     DOMAIN,
     CONF_ENABLE_ENERGY_MONITORING,
+    DEFAULT_ENABLE_ENERGY_MONITORING,
+    SIGNAL_ENERGY_MONITORING,
+    SIGNAL_MIDNIGHT,
+    SIGNAL_NEW_UNITS,
+)
+from .coordinator import EmeraldUnitCoordinator
+from .energy import (
+    EnergyStatisticsImporter,
+    async_claim_import,
+    async_release_import,
 )
+from .entity import EmeraldUnitEntity
+from .health import EntryHealthMonitor
+from .helpers import SampledDebugLog
+from .tank import TankMetrics
 
 _LOGGER = logging.getLogger(__name__)
+# Called for every snapshot
+_UPDATE_LOG = SampledDebugLog(_LOGGER)
+
+_UNREAD = object()
+
+
+@dataclass(frozen=True, kw_only=True)
+class EmeraldHealthSensorDescription(SensorEntityDescription):
+    """Describes a connection health sensor."""
+
+    value_fn: Callable[[EntryHealthMonitor], float | datetime | None]
+
+
+HEALTH_SENSORS = (
+    EmeraldHealthSensorDescription(
+        key="last_message",
+        name="Last message",
+        icon="mdi:message-text-clock",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda health: health.last_message,
+    ),
+    EmeraldHealthSensorDescription(
+        key="messages_per_minute",
+        name="Messages per minute",
+        icon="mdi:message-flash",
+        native_unit_of_measurement="messages/min",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda health: health.messages_per_minute,
+    ),
+    EmeraldHealthSensorDescription(
+        key="reconnects",
+        name="Reconnects",
+        icon="mdi:connection",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda health: health.reconnects,
+    ),
+    EmeraldHealthSensorDescription(
+        key="last_command",
+        name="Last successful command",
+        icon="mdi:send-clock",
+        device_class=SensorDeviceClass.TIMESTAMP,
+        value_fn=lambda health: health.last_command,
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class EmeraldTankSensorDescription(SensorEntityDescription):
+    """Describes a sensor of a unit's derived tank metrics."""
+
+    value_fn: Callable[[TankMetrics], float | None]
+
+
+TANK_SENSORS = (
+    EmeraldTankSensorDescription(
+        key="tank_capacity",
+        name="Tank Capacity",
+        icon="mdi:storage-tank",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda tank: tank.capacity,
+    ),
+    EmeraldTankSensorDescription(
+        key="tank_capacity_rounded",
+        name="Tank Capacity Rounded",
+        icon="mdi:storage-tank-outline",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda tank: tank.capacity_rounded,
+    ),
+    EmeraldTankSensorDescription(
+        key="time_to_target",
+        name="Time to Target",
+        icon="mdi:timer-sand",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MINUTES,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda tank: tank.time_to_target,
+    ),
+)
+
+
+def _tank_sensors(coordinators) -> list[EmeraldTankSensor]:
+    """Return the tank sensors for each of the units."""
+    return [
+        EmeraldTankSensor(coordinator, description)
+        for coordinator in coordinators
+        for description in TANK_SENSORS
+    ]
+
+
+def _energy_monitoring(entry_data: dict) -> bool:
+    """Return whether the entry's energy sensors are turned on."""
+    return entry_data["config"].get(
+        CONF_ENABLE_ENERGY_MONITORING, DEFAULT_ENABLE_ENERGY_MONITORING
+    )
 
 
 async def async_setup_entry(
@@ -28,144 +152,295 @@ async def async_setup_entry(
     config_entry: config_entries.ConfigEntry,
     async_add_entities,
 ):
-    """Set up the energy monitoring sensors for Emerald HWS."""
-    # Check if energy monitoring is enabled in config
-    if not config_entry.data.get(CONF_ENABLE_ENERGY_MONITORING, True):
-        _LOGGER.info("Energy monitoring is disabled in configuration")
-        return True
-
+    """Set up the connection health, tank and energy sensors for Emerald HWS."""
     # Get the shared EmeraldHWS data from hass.data
     entry_data = hass.data[DOMAIN].get(config_entry.entry_id)
     if not entry_data:
         _LOGGER.error("No Emerald HWS data found in hass data")
         return False
 
-    emerald_hws_instance = entry_data["instance"]
-    callback_dispatcher = entry_data["dispatcher"]
+    # One set of connection health sensors for the whole entry
+    async_add_entities(
+        EmeraldHealthSensor(config_entry, entry_data["health"], description)
+        for description in HEALTH_SENSORS
+    )
+    # Units are discovered once, in __init__, and shared with the water_heater
+    # platform
+    async_add_entities(_tank_sensors(entry_data["coordinators"].values()))
+
+    # Energy sensors by unit, while energy monitoring is on
+    energy_sensors: dict[str, EmeraldEnergySensor] = {}
+
+    @callback
+    def _async_add_energy_sensors(coordinators) -> None:
+        """Add energy sensors for the units that do not have one yet."""
+        sensors = []
+        for coordinator in coordinators:
+            if coordinator.hws_uuid not in energy_sensors:
+                sensor = EmeraldEnergySensor(
+                    hass, coordinator, entry_data["connection"].energy_importers
+                )
+                energy_sensors[coordinator.hws_uuid] = sensor
+                sensors.append(sensor)
+        if sensors:
+            async_add_entities(sensors)
+            _LOGGER.info(f"Added {len(sensors)} energy monitoring sensors")
+
+    @callback
+    def _async_set_energy_monitoring(enabled: bool) -> None:
+        """Add or remove every energy sensor as the option is changed."""
+        if enabled:
+            _async_add_energy_sensors(entry_data["coordinators"].values())
+            return
+        for sensor in energy_sensors.values():
+            hass.async_create_task(sensor.async_remove())
+        energy_sensors.clear()
+        _LOGGER.info("Energy monitoring is disabled in configuration")
 
-    sensors = []
-    # Fetch the list of hot water systems (UUIDs)
-    hot_water_systems = await hass.async_add_executor_job(emerald_hws_instance.listHWS)
+    @callback
+    def _async_add_new_units(new_coordinators) -> None:
+        """Add tank and energy sensors for units discovered after setup."""
+        async_add_entities(_tank_sensors(new_coordinators))
+        if _energy_monitoring(entry_data):
+            _async_add_energy_sensors(new_coordinators)
 
-    # Create energy sensors for each hot water system
-    for hws_uuid in hot_water_systems:
-        sensor = EmeraldEnergySensor(
-            hass, emerald_hws_instance, hws_uuid, callback_dispatcher
+    _async_set_energy_monitoring(_energy_monitoring(entry_data))
+    config_entry.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIGNAL_NEW_UNITS.format(config_entry.entry_id),
+            _async_add_new_units,
         )
-        sensors.append(sensor)
+    )
+    config_entry.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIGNAL_ENERGY_MONITORING.format(config_entry.entry_id),
+            _async_set_energy_monitoring,
+        )
+    )
+
+    @callback
+    def _async_midnight(_now) -> None:
+        """Reset every energy sensor of the entry at once."""
+        async_dispatcher_send(hass, SIGNAL_MIDNIGHT.format(config_entry.entry_id))
 
-    # Add energy sensors to Home Assistant
-    if sensors:
-        async_add_entities(sensors, True)
-        _LOGGER.info(f"Added {len(sensors)} energy monitoring sensors")
+    # One listener for the whole entry; async_track_time_change follows Home
+    # Assistant's time zone, including across DST changes.
+    config_entry.async_on_unload(
+        async_track_time_change(hass, _async_midnight, hour=0, minute=0, second=0)
+    )
 
     return True
 
 
-class EmeraldEnergySensor(SensorEntity):
-    """Representation of an Emerald HWS energy usage sensor."""
+class EmeraldEnergySensor(EmeraldUnitEntity, SensorEntity):
+    """Representation of an Emerald HWS energy usage sensor.
+
+    The sensor also runs the unit's hourly energy statistics import, so that
+    both follow the energy monitoring option. Another entry for the same account
+    has a sensor for the unit too; only one of them imports at a time.
+
+    The daily total is reset to zero at midnight in Home Assistant's time zone,
+    on a signal sent once for the whole entry. It stays at zero until the unit
+    reports the new day's first hour.
+    """
+
+    _attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+    _attr_device_class = SensorDeviceClass.ENERGY
+    _attr_state_class = SensorStateClass.TOTAL
+    _attr_icon = "mdi:lightning-bolt"
 
     def __init__(
         self,
         hass: HomeAssistant,
-        emerald_hws_instance: EmeraldHWS,
-        hws_uuid: str,
-        callback_dispatcher,
+        coordinator: EmeraldUnitCoordinator,
+        importers: dict[str, list[EnergyStatisticsImporter]],
     ):
-        """Initialize the energy sensor."""
+        """Initialize the energy sensor.
+
+        importers are those of the entry's shared connection; see
+        async_claim_import.
+        """
+        super().__init__(coordinator)
         self._hass = hass
-        self._emerald_hws = emerald_hws_instance
-        self._hws_uuid = hws_uuid
-        self._callback_dispatcher = callback_dispatcher
-        self._attr_name = None
-        self._attr_unique_id = None
+        self._importers = importers
+        hws_uuid = self._hws_uuid
+        info = coordinator.info
         self._attr_native_value = None
-        self._attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
-        self._attr_device_class = SensorDeviceClass.ENERGY
-        self._attr_state_class = SensorStateClass.TOTAL
-        self._attr_icon = "mdi:lightning-bolt"
-        self._last_reset = None
-        self._today = date.today()
-
-        # Get device info for proper integration
-        gi = emerald_hws_instance.getInfo(hws_uuid)
-        self._serial_number = gi.get("serial_number")
-        self._brand = gi.get("brand", "Emerald")
-
-        # Set up sensor properties
-        self._attr_name = f"{self._brand} {self._serial_number} Daily Energy"
+        self._last_reset = dt_util.start_of_local_day()
+        # The snapshot value the native value was last derived from
+        self._daily_energy: float | None | object = _UNREAD
+        # Set at midnight, until the new day's first reading arrives
+        self._awaiting_reading = False
+
+        self._attr_name = f"{info.name} Daily Energy"
         self._attr_unique_id = f"{DOMAIN}_{hws_uuid}_daily_energy"
 
         # Set up device info for proper grouping with water heater
         self._attr_device_info = {
             "identifiers": {(DOMAIN, hws_uuid)},
-            "name": f"{self._brand} {self._serial_number}",
-            "manufacturer": self._brand,
+            "name": info.name,
+            "manufacturer": info.brand,
             "model": "Hot Water System",
-            "serial_number": self._serial_number,
+            "serial_number": info.serial_number,
         }
 
-        # Register for updates with callback dispatcher
-        callback_dispatcher.register_callback(self.update_callback)
+        self._importer = EnergyStatisticsImporter(hass, coordinator)
 
         # Initialize energy value
         self.update_energy_value()
 
+    async def async_added_to_hass(self) -> None:
+        """Start importing the unit's hourly energy once added."""
+        await super().async_added_to_hass()
+        async_claim_import(self._importers, self._importer)
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self._hass,
+                SIGNAL_MIDNIGHT.format(self.platform.config_entry.entry_id),
+                self._async_reset,
+            )
+        )
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop importing the unit's hourly energy."""
+        async_release_import(self._importers, self._importer)
+        await super().async_will_remove_from_hass()
+
     @property
     def last_reset(self):
         """Return the time when the sensor was last reset (midnight)."""
         return self._last_reset
 
-    def update_callback(self):
-        """Schedules an update within HASS when data changes (module thread)."""
-        _LOGGER.debug(f"Energy sensor callback for {self._attr_name}")
-        if self.hass is None:
-            # The emerald_hws MQTT thread can fire callbacks before the entity
-            # is added to HASS (or after removal). schedule_update_ha_state is
-            # thread-safe, but with self.hass is None it would raise
-            # "'NoneType' object has no attribute 'create_task'".
-            _LOGGER.debug(
-                "Dropping callback for %s; hass not set (entity not added yet "
-                "or already removed)",
-                self._attr_name,
-            )
-            return
-        self.schedule_update_ha_state(True)
+    @callback
+    def _async_reset(self) -> None:
+        """Start a new day at zero."""
+        self._last_reset = dt_util.start_of_local_day()
+        self._attr_native_value = 0.0
+        self._awaiting_reading = True
+        # Yesterday's total stays in the snapshot until the unit next reports;
+        # remember it so that it is not taken up again.
+        snapshot = self._coordinator.snapshot
+        self._daily_energy = snapshot.daily_energy if snapshot else None
+        _LOGGER.info(f"Daily energy sensor reset for {self._attr_name}")
+        self._async_write_if_changed()
 
     def update_energy_value(self):
-        """Update the energy value from the API."""
-        try:
-            # Check if we need to reset (new day)
-            today = date.today()
-            if today != self._today:
-                self._today = today
-                self._last_reset = datetime.combine(today, datetime.min.time())
-                _LOGGER.info(f"Daily energy sensor reset for {self._attr_name}")
-
-            # Get daily energy usage
-            daily_energy = self._emerald_hws.getDailyEnergyUsage(self._hws_uuid)
-            if daily_energy is not None:
-                self._attr_native_value = round(
-                    daily_energy, 3
-                )  # Round to 3 decimal places
-            else:
-                _LOGGER.warning(f"Failed to get daily energy for {self._hws_uuid}")
-                self._attr_native_value = None
-        except Exception as e:
-            _LOGGER.error(f"Error updating energy value for {self._hws_uuid}: {e}")
+        """Update the energy value from the coordinator's snapshot."""
+        snapshot = self._coordinator.snapshot
+        daily_energy = snapshot.daily_energy if snapshot else None
+        if daily_energy == self._daily_energy:
+            # Energy changes hourly; most snapshots are temperature changes.
+            return
+        self._daily_energy = daily_energy
+        if daily_energy is None and self._awaiting_reading:
+            # Nothing reported for the new day yet; zero is right.
+            return
+        self._awaiting_reading = False
+        if daily_energy is not None:
+            self._attr_native_value = round(
+                daily_energy, 3
+            )  # Round to 3 decimal places
+        else:
+            _LOGGER.warning(f"Failed to get daily energy for {self._hws_uuid}")
             self._attr_native_value = None
 
-    def update(self):
-        """Update the sensor state."""
-        _LOGGER.debug(f"Updating energy sensor {self._attr_name}")
+    def _state_fingerprint(self):
+        """Return a compact summary of the state last shown."""
+        return (self._attr_native_value, self._last_reset)
+
+    @callback
+    def _process_snapshot(self) -> None:
+        """Take the energy value from the coordinator's new snapshot."""
+        _UPDATE_LOG("Updating energy sensor %s", self._attr_name)
         self.update_energy_value()
 
-    async def async_update(self) -> None:
-        """Update the sensor state asynchronously."""
-        await self._hass.async_add_executor_job(self.update)
+
+class EmeraldTankSensor(EmeraldUnitEntity, SensorEntity):
+    """A sensor of one of a unit's tank metrics.
+
+    The metrics are worked out by the coordinator as each snapshot arrives, so
+    the sensor only reads them.
+    """
+
+    entity_description: EmeraldTankSensorDescription
+
+    def __init__(
+        self,
+        coordinator: EmeraldUnitCoordinator,
+        description: EmeraldTankSensorDescription,
+    ):
+        """Initialize the tank sensor."""
+        super().__init__(coordinator)
+        self.entity_description = description
+        info = coordinator.info
+        self._attr_name = f"{info.name} {description.name}"
+        self._attr_unique_id = f"{DOMAIN}_{self._hws_uuid}_{description.key}"
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, self._hws_uuid)},
+            "name": info.name,
+            "manufacturer": info.brand,
+            "model": "Hot Water System",
+            "serial_number": info.serial_number,
+        }
+
+    @property
+    def native_value(self):
+        """Return the metric from the coordinator's latest snapshot."""
+        return self.entity_description.value_fn(self._coordinator.tank)
+
+    def _state_fingerprint(self):
+        """Return a compact summary of the state last shown."""
+        return self.native_value
+
+
+class EmeraldHealthSensor(SensorEntity):
+    """A diagnostic sensor showing one figure of the cloud connection's health."""
+
+    entity_description: EmeraldHealthSensorDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_should_poll = False
+
+    def __init__(
+        self,
+        config_entry: config_entries.ConfigEntry,
+        health: EntryHealthMonitor,
+        description: EmeraldHealthSensorDescription,
+    ):
+        """Initialize the health sensor."""
+        self.entity_description = description
+        self._health = health
+        self._remove_listener = None
+        self._attr_name = f"Emerald cloud {description.name.lower()}"
+        self._attr_unique_id = f"{DOMAIN}_{config_entry.entry_id}_{description.key}"
+        self._attr_native_value = description.value_fn(health)
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, config_entry.entry_id)},
+            "name": "Emerald cloud connection",
+            "manufacturer": "Emerald",
+            "entry_type": DeviceEntryType.SERVICE,
+        }
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the health monitor once added to Home Assistant."""
+        await super().async_added_to_hass()
+        self._remove_listener = self._health.async_add_listener(
+            self._handle_health_update
+        )
+
+    @callback
+    def _handle_health_update(self) -> None:
+        """Write the new figure, if it changed."""
+        value = self.entity_description.value_fn(self._health)
+        if value == self._attr_native_value:
+            return
+        self._attr_native_value = value
+        self.async_write_ha_state()
 
     async def async_will_remove_from_hass(self) -> None:
-        """Clean up when entity is removed from Home Assistant."""
-        # Unregister from callback dispatcher
-        self._callback_dispatcher.unregister_callback(self.update_callback)
+        """Stop following the health monitor."""
+        if self._remove_listener is not None:
+            self._remove_listener()
+            self._remove_listener = None
         await super().async_will_remove_from_hass()
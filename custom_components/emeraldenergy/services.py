@@ -0,0 +1,202 @@
+"""Services for the Emerald Hot Water System integration."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from pathlib import Path
+
+import voluptuous as vol
+from homeassistant.components.water_heater import (
+    ATTR_OPERATION_MODE,
+    STATE_OFF,
+)
+from homeassistant.const import Platform
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv, entity_registry as er
+from homeassistant.helpers.service import async_extract_entity_ids
+
+from .commands import OPERATION_MODES
+from .const import DEFAULT_BULK_COMMANDS, DOMAIN, MAX_BULK_COMMANDS
+from .recording import write_recording
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_EXPORT_RECORDING = "export_recording"
+SERVICE_SET_MODE = "set_mode"
+
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_MAX_CONCURRENT = "max_concurrent"
+
+EXPORT_RECORDING_SCHEMA = vol.Schema({vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string})
+
+SET_MODE_SCHEMA = vol.Schema(
+    {
+        **cv.ENTITY_SERVICE_FIELDS,
+        vol.Required(ATTR_OPERATION_MODE): vol.In([*OPERATION_MODES, STATE_OFF]),
+        vol.Optional(ATTR_MAX_CONCURRENT, default=DEFAULT_BULK_COMMANDS): vol.All(
+            int, vol.Range(min=1, max=MAX_BULK_COMMANDS)
+        ),
+    }
+)
+
+# Per-unit outcomes of set_mode
+RESULT_SUCCESS = "success"
+RESULT_TIMEOUT = "timeout"
+RESULT_FAILED = "failed"
+
+
+def _recording_path(hass: HomeAssistant, entry_id: str) -> Path:
+    """Return where the recording of an entry is exported to."""
+    return Path(hass.config.path(f"{DOMAIN}_recording_{entry_id}.jsonl"))
+
+
+async def _async_export_recording(call: ServiceCall) -> ServiceResponse:
+    """Write the status messages recorded for each entry to a replay file."""
+    hass = call.hass
+    entries = hass.data.get(DOMAIN, {})
+    if (entry_id := call.data.get(ATTR_CONFIG_ENTRY_ID)) is not None:
+        entries = {entry_id: entries[entry_id]} if entry_id in entries else {}
+    recorders = {
+        entry_id: entry_data["recorder"]
+        for entry_id, entry_data in entries.items()
+        if entry_data.get("recorder") is not None
+    }
+    if not recorders:
+        raise ServiceValidationError(
+            "No Emerald HWS entry is recording status messages; set the number "
+            "of messages to record in the integration's options"
+        )
+
+    files = []
+    for entry_id, recorder in recorders.items():
+        messages = recorder.snapshot()
+        path = _recording_path(hass, entry_id)
+        # Decoding every payload takes a while, so it happens with the write.
+        await hass.async_add_executor_job(write_recording, path, messages)
+        _LOGGER.info(f"Exported {len(messages)} status messages to {path}")
+        files.append(
+            {
+                ATTR_CONFIG_ENTRY_ID: entry_id,
+                "path": str(path),
+                "messages": len(messages),
+            }
+        )
+    return {"files": files}
+
+
+def _target_coordinators(hass: HomeAssistant, entity_ids: set[str]) -> dict:
+    """Return the coordinator of each targeted Emerald water heater, by entity ID.
+
+    Other entities the target takes in, such as another integration's water
+    heater in a targeted area, are left out.
+    """
+    registry = er.async_get(hass)
+    entries = hass.data.get(DOMAIN, {})
+    prefix = f"{DOMAIN}_"
+    coordinators = {}
+    for entity_id in sorted(entity_ids):
+        entity = registry.async_get(entity_id)
+        if (
+            entity is None
+            or entity.platform != DOMAIN
+            or entity.domain != Platform.WATER_HEATER
+            or (entry_data := entries.get(entity.config_entry_id)) is None
+        ):
+            continue
+        hws_uuid = entity.unique_id.removeprefix(prefix)
+        if (coordinator := entry_data["coordinators"].get(hws_uuid)) is not None:
+            coordinators[entity_id] = coordinator
+    return coordinators
+
+
+async def _async_command(
+    coordinator, operation_mode: str, semaphore: asyncio.Semaphore
+) -> dict:
+    """Command one unit into an operation mode, returning how it went."""
+    async with semaphore:
+        start = time.monotonic()
+        try:
+            await coordinator.commands.async_request_operation(operation_mode)
+        except HomeAssistantError as err:
+            # A publish the broker never acknowledged; see _call_hws
+            timed_out = isinstance(err.__cause__, TimeoutError)
+            return {
+                "result": RESULT_TIMEOUT if timed_out else RESULT_FAILED,
+                "error": str(err),
+            }
+        return {
+            "result": RESULT_SUCCESS,
+            "duration": round(time.monotonic() - start, 3),
+        }
+
+
+async def _async_set_mode(call: ServiceCall) -> ServiceResponse:
+    """Command every targeted unit into an operation mode, several at once.
+
+    Each unit's command goes through its command queue, like a change made on
+    its water heater, but the units are not waited on one by one: up to
+    max_concurrent of them are sent at once, so changing a whole fleet takes
+    about as long as a single unit's publish.
+    """
+    hass = call.hass
+    coordinators = _target_coordinators(
+        hass, await async_extract_entity_ids(hass, call)
+    )
+    if not coordinators:
+        raise ServiceValidationError(
+            "No Emerald HWS water heaters were targeted; pick their entities, "
+            "devices or areas"
+        )
+    operation_mode = call.data[ATTR_OPERATION_MODE]
+    semaphore = asyncio.Semaphore(call.data[ATTR_MAX_CONCURRENT])
+    _LOGGER.info(
+        f"Setting {len(coordinators)} Emerald HWS units to {operation_mode}, "
+        f"{call.data[ATTR_MAX_CONCURRENT]} at a time"
+    )
+    outcomes = await asyncio.gather(
+        *(
+            _async_command(coordinator, operation_mode, semaphore)
+            for coordinator in coordinators.values()
+        )
+    )
+    results = dict(zip(coordinators, outcomes))
+    failed = [
+        entity_id
+        for entity_id, outcome in results.items()
+        if outcome["result"] != RESULT_SUCCESS
+    ]
+    if failed and not call.return_response:
+        # Nothing would see the per-unit results, so fail the call instead.
+        raise HomeAssistantError(
+            f"Failed to set {', '.join(failed)} to {operation_mode}: "
+            + "; ".join(results[entity_id]["error"] for entity_id in failed)
+        )
+    return {"results": results}
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration's services."""
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_RECORDING,
+        _async_export_recording,
+        schema=EXPORT_RECORDING_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_MODE,
+        _async_set_mode,
+        schema=SET_MODE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
@@ -0,0 +1,49 @@
+"""Lightweight performance counters for the Emerald Hot Water System integration."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Sequence
+from typing import Any
+
+# Upper bounds of the buckets, in seconds for timings
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30)
+FANOUT_BUCKETS = (0, 1, 2, 4, 8, 16)
+
+
+class Histogram:
+    """Count samples into fixed buckets, keeping their count, sum and maximum.
+
+    Recording is a bisect and a few additions, cheap enough for every MQTT
+    message. Samples may be added from any thread without a lock: a race can at
+    worst lose a sample, which diagnostics can live with.
+    """
+
+    __slots__ = ("_bounds", "_buckets", "count", "total", "max")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS) -> None:
+        """Initialize an empty histogram with the given bucket upper bounds."""
+        self._bounds = tuple(bounds)
+        self._buckets = [0] * (len(self._bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        """Record one sample."""
+        self._buckets[bisect_left(self._bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the histogram in a form fit for a diagnostics download."""
+        buckets = {f"<={bound}": n for bound, n in zip(self._bounds, self._buckets)}
+        buckets[f">{self._bounds[-1]}"] = self._buckets[-1]
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "max": self.max,
+            "buckets": buckets,
+        }
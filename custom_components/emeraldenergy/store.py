@@ -0,0 +1,101 @@
+"""Local cache of unit details and state for the Emerald Hot Water System integration."""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Mapping
+from dataclasses import astuple
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .coordinator import UnitInfo, UnitSnapshot
+
+if TYPE_CHECKING:
+    from .coordinator import EmeraldUnitCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+# Snapshots change with every status message; the cache only has to be close
+# enough to draw a dashboard before the cloud answers, so write it at most this
+# often (seconds).
+SAVE_DELAY = 60
+
+
+class EmeraldStateCache:
+    """Keep the last known details and snapshot of every unit of a config entry.
+
+    Each unit is stored as two flat lists in dataclass field order, which keeps
+    the file small and cheap to write. Anything that no longer matches the
+    dataclasses is dropped on load rather than migrated: the cache is only a head
+    start, and live data replaces it within seconds of connecting.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        coordinators: Mapping[str, EmeraldUnitCoordinator],
+    ) -> None:
+        """Initialize the cache for a config entry's coordinators."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}"
+        )
+        self._coordinators = coordinators
+        self._save_scheduled = False
+
+    async def async_load(self) -> dict[str, tuple[UnitInfo, UnitSnapshot | None]]:
+        """Return the cached details and snapshot of every unit."""
+        try:
+            data = await self._store.async_load()
+        except Exception:
+            # A corrupt cache must never stop setup; it is rebuilt as data arrives.
+            _LOGGER.exception("Failed to load the Emerald HWS state cache")
+            return {}
+        units = {}
+        for hws_uuid, cached in ((data or {}).get("units") or {}).items():
+            try:
+                info, snapshot = cached
+                units[hws_uuid] = (
+                    UnitInfo(*info),
+                    UnitSnapshot(*snapshot) if snapshot else None,
+                )
+            except (TypeError, ValueError):
+                # Written by a version with different fields; skip the unit.
+                continue
+        return units
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """Save the cache SAVE_DELAY seconds from now, unless already scheduled.
+
+        async_delay_save restarts its delay on every call, so calling it for each
+        snapshot would put the write off for as long as the units keep talking.
+        """
+        if self._save_scheduled:
+            return
+        self._save_scheduled = True
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the cache contents for the store."""
+        self._save_scheduled = False
+        return {
+            "units": {
+                hws_uuid: [
+                    astuple(coordinator.info),
+                    astuple(coordinator.live_snapshot)
+                    if coordinator.live_snapshot
+                    else None,
+                ]
+                for hws_uuid, coordinator in self._coordinators.items()
+            }
+        }
+
+    async def async_remove(self) -> None:
+        """Delete the cache file."""
+        await self._store.async_remove()
@@ -0,0 +1,181 @@
+"""Derived tank metrics for the Emerald Hot Water System integration."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .coordinator import UnitSnapshot
+
+# Temperature samples the heat-up rate is fitted over
+HEAT_UP_SAMPLES = 32
+# Fewer samples than this give no rate; units report whole degrees
+MIN_HEAT_UP_SAMPLES = 3
+
+
+def tank_capacity(current, target) -> tuple[int, int] | None:
+    """Return the derived tank capacity percentage, exact and app-rounded."""
+    if current is None or target is None:
+        return None
+    # Tank capacity is not returned by the API; derive it the same way the
+    # Emerald app does: each degree below target costs ~2.3% capacity, and
+    # the app displays the result snapped to the nearest 20% step.
+    raw = 100 - 2.3 * (target - current)
+    clamped = max(0.0, min(100.0, raw))
+    return int(round(clamped)), int(round(clamped / 20) * 20)
+
+
+class HeatUpRate:
+    """Least-squares rate of temperature rise over the most recent samples.
+
+    Samples sit in a fixed-size ring buffer, and the sums behind the fit are
+    updated as each sample comes in and the oldest drops out, so adding one
+    costs the same however large the buffer. Times in the sums are relative to
+    the newest sample, which keeps them small enough for the fit to stay
+    accurate; moving them along is O(1) as well. The sums are recomputed from
+    the buffer once per lap of it, so that rounding cannot build up.
+    """
+
+    __slots__ = (
+        "_times",
+        "_temps",
+        "_next",
+        "_count",
+        "_origin",
+        "_st",
+        "_sy",
+        "_stt",
+        "_sty",
+    )
+
+    def __init__(self, size: int = HEAT_UP_SAMPLES) -> None:
+        """Initialize an empty fit over the last size samples."""
+        self._times = [0.0] * size
+        self._temps = [0.0] * size
+        self.clear()
+
+    def clear(self) -> None:
+        """Forget every sample."""
+        self._next = 0
+        self._count = 0
+        self._origin = 0.0
+        self._st = self._sy = self._stt = self._sty = 0.0
+
+    def add(self, when: float, temperature: float) -> None:
+        """Add a sample: the temperature at when, a monotonic time in seconds."""
+        # Move the time origin to the new sample
+        shift = when - self._origin
+        count = self._count
+        self._stt += count * shift * shift - 2 * shift * self._st
+        self._sty -= shift * self._sy
+        self._st -= count * shift
+        self._origin = when
+
+        index = self._next
+        if count == len(self._times):
+            offset = self._times[index] - when
+            evicted = self._temps[index]
+            self._st -= offset
+            self._sy -= evicted
+            self._stt -= offset * offset
+            self._sty -= offset * evicted
+            count -= 1
+        self._times[index] = when
+        self._temps[index] = temperature
+        # At time 0 the new sample adds nothing to the time sums.
+        self._sy += temperature
+        self._count = count + 1
+        self._next = (index + 1) % len(self._times)
+        if self._next == 0:
+            self._recompute()
+
+    def _recompute(self) -> None:
+        """Rebuild the sums from the buffer."""
+        self._st = self._sy = self._stt = self._sty = 0.0
+        for when, temperature in zip(
+            self._times[: self._count], self._temps[: self._count]
+        ):
+            offset = when - self._origin
+            self._st += offset
+            self._sy += temperature
+            self._stt += offset * offset
+            self._sty += offset * temperature
+
+    @property
+    def rate(self) -> float | None:
+        """Return the fitted rate in degrees per second, or None if unknown."""
+        count = self._count
+        if count < MIN_HEAT_UP_SAMPLES:
+            return None
+        spread = count * self._stt - self._st * self._st
+        if spread <= 0:
+            return None
+        return (count * self._sty - self._st * self._sy) / spread
+
+
+class TankMetrics:
+    """Metrics derived from one unit's snapshots, worked out once per snapshot.
+
+    The capacity follows the temperatures. The time to target is learned: each
+    heating run's temperature samples are fitted for the rate the unit heats up
+    at, and the last good rate is kept between runs, so that an estimate is
+    available as soon as the unit falls below its target.
+    """
+
+    __slots__ = (
+        "capacity",
+        "capacity_rounded",
+        "time_to_target",
+        "heat_up_rate",
+        "_fit",
+        "_heating",
+        "_temperature",
+    )
+
+    def __init__(self) -> None:
+        """Initialize with nothing known."""
+        self.capacity: int | None = None
+        self.capacity_rounded: int | None = None
+        # Minutes until the tank reaches its target temperature
+        self.time_to_target: int | None = None
+        # Degrees per hour, from the current heating run or the last one
+        self.heat_up_rate: float | None = None
+        self._fit = HeatUpRate()
+        self._heating = False
+        self._temperature: float | None = None
+
+    def observe(self, snapshot: UnitSnapshot, now: float | None) -> None:
+        """Work out the metrics for a new snapshot, taken at monotonic time now.
+
+        A snapshot without a time, such as one restored from the cache, is not
+        sampled for the heat-up rate.
+        """
+        current = snapshot.current_temperature
+        target = snapshot.target_temperature
+        self.capacity, self.capacity_rounded = tank_capacity(current, target) or (
+            None,
+            None,
+        )
+
+        heating = bool(now is not None and snapshot.is_on and snapshot.is_heating)
+        if heating and current is not None:
+            if not self._heating:
+                # A new run; the last one's samples include its cool-down.
+                self._fit.clear()
+                self._fit.add(now, current)
+            elif current != self._temperature:
+                self._fit.add(now, current)
+            rate = self._fit.rate
+            if rate is not None and rate > 0:
+                self.heat_up_rate = rate * 3600
+        self._heating = heating
+        self._temperature = current
+
+        if current is None or target is None or not snapshot.is_on:
+            self.time_to_target = None
+        elif current >= target:
+            self.time_to_target = 0
+        elif self.heat_up_rate:
+            self.time_to_target = round((target - current) * 60 / self.heat_up_rate)
+        else:
+            self.time_to_target = None
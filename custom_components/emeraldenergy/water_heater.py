@@ -19,39 +19,20 @@ from homeassistant.const import (
     PRECISION_WHOLE,
     UnitOfTemperature,
 )
-from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import HomeAssistantError
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
 from .const import (
     DOMAIN,
+    SIGNAL_NEW_UNITS,
 )
+from .commands import OPERATION_MODES
+from .entity import EmeraldUnitEntity
+from .helpers import SampledDebugLog
 
 _LOGGER = logging.getLogger(__name__)
-
-
-def _call_hws(action: str, func, *args) -> None:
-    """Run a blocking emerald_hws control call, translating failures for HASS.
-
-    Control commands are MQTT publishes that block until the broker acknowledges
-    them. If the connection to the Emerald cloud has dropped, the publish is
-    queued rather than delivered and the call raises TimeoutError after 20
-    seconds. Let that surface as a HomeAssistantError so the service call fails
-    cleanly instead of logging an unexpected-error traceback.
-    """
-    try:
-        func(*args)
-    except TimeoutError as err:
-        raise HomeAssistantError(
-            f"Timed out sending '{action}' to the Emerald hot water system. "
-            "The connection to the Emerald cloud may be down; the command was "
-            "not applied."
-        ) from err
-    except Exception as err:
-        # emerald_hws raises bare Exceptions for an unknown unit or a missing
-        # MQTT client, so there is no narrower type to catch here.
-        raise HomeAssistantError(
-            f"Failed to send '{action}' to the Emerald hot water system: {err}"
-        ) from err
+# Called for every snapshot
+_UPDATE_LOG = SampledDebugLog(_LOGGER)
 
 
 PLATFORM_SCHEMA = vol.Schema(
@@ -75,53 +56,57 @@ async def async_setup_entry(
         _LOGGER.error("No Emerald HWS data found in hass data")
         return False
 
-    emerald_hws_instance = entry_data["instance"]
-    callback_dispatcher = entry_data["dispatcher"]
-
-    # Fetch the list of hot water systems (UUIDs)
-    hot_water_systems = await hass.async_add_executor_job(emerald_hws_instance.listHWS)
+    # Units are discovered once, in __init__, and shared with the sensor platform
+    coordinators = entry_data["coordinators"].values()
 
     # Create water heater entities for each hot water system
     water_heaters = [
-        EmeraldWaterHeater(hass, emerald_hws_instance, hws_uuid, callback_dispatcher)
-        for hws_uuid in hot_water_systems
+        EmeraldWaterHeater(hass, coordinator) for coordinator in coordinators
     ]
 
     # Add water heater entities to Home Assistant
-    async_add_entities(water_heaters, True)
+    async_add_entities(water_heaters)
+
+    @callback
+    def _async_add_new_units(new_coordinators) -> None:
+        """Add water heaters for units discovered after setup."""
+        async_add_entities(
+            [EmeraldWaterHeater(hass, coordinator) for coordinator in new_coordinators]
+        )
+
+    config_entry.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIGNAL_NEW_UNITS.format(config_entry.entry_id),
+            _async_add_new_units,
+        )
+    )
 
     return True
 
 
-class EmeraldWaterHeater(WaterHeaterEntity):
-    """Representation of a water heater."""
+# Shared by every water heater; Home Assistant only reads it.
+OPERATION_LIST = [STATE_HEAT_PUMP, STATE_PERFORMANCE, STATE_ECO, STATE_OFF]
 
-    def __init__(self, hass, emerald_hws_instance, hws_uuid, callback_dispatcher):
+
+class EmeraldWaterHeater(EmeraldUnitEntity, WaterHeaterEntity):
+    """Representation of a water heater.
+
+    Everything it shows is read from the coordinator's shared UnitInfo and
+    snapshot rather than copied into the entity.
+    """
+
+    _attr_icon = "mdi:water-boiler"
+    _attr_precision = PRECISION_WHOLE
+    # Kept for automations; the tank sensors are what get recorded.
+    _unrecorded_attributes = frozenset(
+        {"tank_capacity_percent", "tank_capacity_percent_rounded"}
+    )
+
+    def __init__(self, hass, coordinator):
         """Initialize the water heater."""
-        self._emerald_hws = emerald_hws_instance
+        super().__init__(coordinator)
         self._hass = hass
-        self._hws_uuid = hws_uuid
-        self._callback_dispatcher = callback_dispatcher
-        gi = emerald_hws_instance.getInfo(hws_uuid)
-        status = emerald_hws_instance.getFullStatus(hws_uuid)
-        self._serial_number = gi.get("serial_number")
-        self._brand = gi.get("brand")
-        self._name = f"{self._brand} {self._serial_number}"
-        self._current_temperature = status.get("last_state").get("temp_current")
-        self._target_temperature = status.get("last_state").get("temp_set")
-        self._running = emerald_hws_instance.isOn(hws_uuid)
-        self._current_mode = emerald_hws_instance.currentMode(hws_uuid)
-        self._operation_list = [
-            STATE_HEAT_PUMP,
-            STATE_PERFORMANCE,
-            STATE_ECO,
-            STATE_OFF,
-        ]
-        self._is_heating = emerald_hws_instance.isHeating(hws_uuid)
-        self._attr_icon = "mdi:water-boiler"
-        self._attr_precision = PRECISION_WHOLE
-        # Register with the callback dispatcher instead of directly with the API
-        callback_dispatcher.register_callback(self.update_callback)
 
     @property
     def supported_features(self) -> int:
@@ -131,7 +116,7 @@ class EmeraldWaterHeater(WaterHeaterEntity):
     @property
     def name(self) -> str:
         """Return the name of the water heater."""
-        return self._name
+        return self._coordinator.info.name
 
     @property
     def unique_id(self) -> str:
@@ -141,25 +126,30 @@ class EmeraldWaterHeater(WaterHeaterEntity):
     @property
     def current_operation(self):
         """Return current operating mode."""
-        if not self._running:
+        snapshot = self._coordinator.snapshot
+        if snapshot is None:
+            return None
+        if not snapshot.is_on:
             return STATE_OFF
         else:
-            return self.modeToOpState(self._current_mode)
+            return self.modeToOpState(snapshot.mode)
 
     @property
     def current_temperature(self) -> float:
         """Return the current temperature."""
-        return self._current_temperature
+        snapshot = self._coordinator.snapshot
+        return snapshot.current_temperature if snapshot else None
 
     @property
     def target_temperature(self) -> float:
         """Return the target temperature."""
-        return self._target_temperature
+        snapshot = self._coordinator.snapshot
+        return snapshot.target_temperature if snapshot else None
 
     @property
     def operation_list(self) -> list[str]:
         """Return list of possible operation modes."""
-        return self._operation_list
+        return OPERATION_LIST
 
     @property
     def temperature_unit(self) -> str:
@@ -170,21 +160,31 @@ class EmeraldWaterHeater(WaterHeaterEntity):
     def extra_state_attributes(self):
         """Return additional state attributes."""
         attrs = super().extra_state_attributes or {}
-        attrs["is_heating"] = self._is_heating
-
-        current = self._current_temperature
-        target = self._target_temperature
-        if current is not None and target is not None:
-            # Tank capacity is not returned by the API; derive it the same way the
-            # Emerald app does: each degree below target costs ~2.3% capacity, and
-            # the app displays the result snapped to the nearest 20% step.
-            raw = 100 - 2.3 * (target - current)
-            clamped = max(0.0, min(100.0, raw))
-            attrs["tank_capacity_percent"] = int(round(clamped))
-            attrs["tank_capacity_percent_rounded"] = int(round(clamped / 20) * 20)
+        snapshot = self._coordinator.snapshot
+        if snapshot is None:
+            return attrs
+        attrs["is_heating"] = snapshot.is_heating
+
+        tank = self._coordinator.tank
+        if tank.capacity is not None:
+            attrs["tank_capacity_percent"] = tank.capacity
+            attrs["tank_capacity_percent_rounded"] = tank.capacity_rounded
 
         return attrs
 
+    def _state_fingerprint(self):
+        """Return a compact summary of the state and attributes last shown."""
+        snapshot = self._coordinator.snapshot
+        if snapshot is None:
+            return None
+        # The capacity attributes follow from the two temperatures.
+        return (
+            self.current_operation,
+            snapshot.current_temperature,
+            snapshot.target_temperature,
+            snapshot.is_heating,
+        )
+
     def modeToOpState(self, mode):
         """Return the HASS state given an Emerald internal int state."""
         if mode == 1:
@@ -194,74 +194,24 @@ class EmeraldWaterHeater(WaterHeaterEntity):
         elif mode == 2:
             return STATE_ECO
 
-    def set_operation_mode(self, operation_mode: str) -> None:
-        """Set the internal state given a HASS state."""
-        _LOGGER.info(f"emeraldhws: setting operation mode to {operation_mode}")
-        if self._running:
-            if operation_mode == STATE_OFF:
-                _call_hws("turn off", self._emerald_hws.turnOff, self._hws_uuid)
-        else:
-            if operation_mode != STATE_OFF:
-                _call_hws("turn on", self._emerald_hws.turnOn, self._hws_uuid)
-
-        if operation_mode == STATE_PERFORMANCE:
-            _call_hws("boost mode", self._emerald_hws.setBoostMode, self._hws_uuid)
-        if operation_mode == STATE_ECO:
-            _call_hws("quiet mode", self._emerald_hws.setQuietMode, self._hws_uuid)
-        if operation_mode == STATE_HEAT_PUMP:
-            _call_hws("normal mode", self._emerald_hws.setNormalMode, self._hws_uuid)
+    def opStateToMode(self, operation_mode):
+        """Return the Emerald internal int state given a HASS state."""
+        return OPERATION_MODES.get(operation_mode)
 
     async def async_set_operation_mode(self, operation_mode):
-        """Schedule the sync function to set the operation mode."""
-        await self._hass.async_add_executor_job(self.set_operation_mode, operation_mode)
+        """Queue the unit's power and mode commands for the operation mode."""
+        _LOGGER.info(f"emeraldhws: setting operation mode to {operation_mode}")
+        await self._coordinator.commands.async_request_operation(operation_mode)
 
     async def async_turn_on(self):
         """Turn on the Emerald unit."""
-        await self._hass.async_add_executor_job(
-            _call_hws, "turn on", self._emerald_hws.turnOn, self._hws_uuid
-        )
+        await self._coordinator.commands.async_request(is_on=True)
 
     async def async_turn_off(self):
         """Turn off the Emerald unit."""
-        await self._hass.async_add_executor_job(
-            _call_hws, "turn off", self._emerald_hws.turnOff, self._hws_uuid
-        )
+        await self._coordinator.commands.async_request(is_on=False)
 
-    def update_callback(self):
-        """Schedules an update within HASS (called from the module's thread)."""
-        _LOGGER.info("emeraldhws: callback called")
-        if self.hass is None:
-            # The emerald_hws MQTT thread can fire callbacks before the entity
-            # is added to HASS (or after removal). schedule_update_ha_state is
-            # thread-safe, but with self.hass is None it would raise
-            # "'NoneType' object has no attribute 'create_task'".
-            _LOGGER.debug(
-                "Dropping callback for %s; hass not set (entity not added yet "
-                "or already removed)",
-                self._name,
-            )
-            return
-        self.schedule_update_ha_state(True)
-
-    def update(self):
-        """Update with values from HWS."""
-        _LOGGER.info("emeraldhws: updating internal state from module")
-        state = self._emerald_hws.getFullStatus(self._hws_uuid)
-
-        if state is not None:
-            self._current_temperature = state.get("last_state").get("temp_current")
-            self._target_temperature = state.get("last_state").get("temp_set")
-            self._running = self._emerald_hws.isOn(self._hws_uuid)
-            self._current_mode = self._emerald_hws.currentMode(self._hws_uuid)
-            self._is_heating = self._emerald_hws.isHeating(self._hws_uuid)
-        return
-
-    async def async_update(self) -> None:
-        """Update the water heater state."""
-        await self._hass.async_add_executor_job(self.update)
-
-    async def async_will_remove_from_hass(self) -> None:
-        """Clean up when entity is removed from Home Assistant."""
-        # Unregister from callback dispatcher
-        self._callback_dispatcher.unregister_callback(self.update_callback)
-        await super().async_will_remove_from_hass()
+    @callback
+    def _process_snapshot(self) -> None:
+        """Log the coordinator's new snapshot."""
+        _UPDATE_LOG("emeraldhws: updating internal state from module")